@@ -30,6 +30,7 @@ class Error(Exception):
 def delete(branch: Sequence[str], merged: str):
     '''Remove a branch and all related branches.'''
     gc = repo.Cache()
+    gc.prefetch()
 
     input_branches = set(branch)
     if merged:
@@ -43,7 +44,7 @@ def delete(branch: Sequence[str], merged: str):
         if arg not in gc.branch_by_abbrev:
             raise Error(f'Branch {arg!r} not found')
         b = gc.branch_by_abbrev[arg]
-        if b.name == git.current_branch:
+        if b.name == git.current_branch():
             _logger.error('Cannot delete current branch')
             continue
         if b.protected:
@@ -5,6 +5,7 @@
 
 import typing as t
 
+import concurrent.futures
 import logging
 
 import click
@@ -17,6 +18,7 @@ from jf.cmd import root
 
 
 _logger = logging.getLogger(__name__)
+_JENKINS_WORKERS = 4
 
 
 class Error(Exception):
@@ -34,79 +36,90 @@ def green(ctx: click.Context, branch: t.Optional[str]):
     git.check_workdir_is_clean()
 
     gc = repo.Cache()
-
-    if branch:
-        b = gc.branches[branch]
-        return _green(ctx, gc, b)
-    else:
-        for branch_name in gc.cfg.jf.default_green.value:
-            _green(ctx, gc, gc.branches[branch_name])
-
-
-def _green(ctx: click.Context, gc: repo.Cache, branch: repo.Branch):
+    gc.prefetch(commits=True)
+    jc = jenkins.Cache(ctx)
+    ctx.call_on_close(jc.close)
+
+    branch_names = [branch] if branch else gc.cfg.jf.default_green.value
+    branches = [gc.branches[branch_name] for branch_name in branch_names]
+    # Only branches that pass the checks cost Jenkins requests.
+    branches = [b for b in branches if _needs_green(b)]
+
+    # Jenkins lookups are independent, so they run concurrently; git updates stay sequential.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=_JENKINS_WORKERS) as pool:
+        shas = [pool.submit(_last_success_sha, jc, b) for b in branches]
+        for b, sha in zip(branches, shas):
+            _green(gc, b, sha.result())
+
+
+def _last_success_sha(jc: jenkins.Cache, branch: repo.Branch) -> str:
+    '''Gets SHA of the last successful Jenkins build of the branch.'''
+    build_kinds = ('lastCompletedBuild', 'lastSuccessfulBuild', 'lastStableBuild')
+    branch_status = jc.get_json(
+        jenkins.branch_url(branch.name, api=True),
+        tree=','.join(f'{n}[number,url]' for n in build_kinds),
+    )
+    for n in build_kinds:
+        _logger.info('%s: %r -> %r', n, branch_status[n]['number'], branch_status[n]['url'])
+
+    last_successful_build = jc.get_json(jenkins.api_url(branch_status['lastSuccessfulBuild']['url']))
+
+    last_success_action = None
+    for action in last_successful_build['actions']:
+        builds = action.get('buildsByBranchName')
+        if not builds:
+            continue
+        develop_build = builds.get(branch.name)
+        if not develop_build:
+            continue
+        last_success_action = develop_build
+        break
+
+    if not last_success_action:
+        raise Error('Last successful build not found')
+
+    last_success_sha = last_success_action['revision']['SHA1']
+
+    _logger.info('lastSuccessfulBuildSHA = %r', last_success_sha)
+    return last_success_sha
+
+
+def _needs_green(branch: repo.Branch) -> bool:
+    '''Checks the branch has a tested branch to update other than itself.'''
     if not branch.tested or not branch.tested.branch:
         raise Error('No name for "tested" branch')
 
-    green_branch_name = branch.tested.branch
-    green_ref_name = green_branch_name.ref(git.REMOTE_LOCAL)
-    green_ref = gc.refs.get(green_ref_name, None)
-    green_upstream_ref_name = green_branch_name.ref(git.REMOTE_ORIGIN)
-    green_upstream_ref = gc.refs.get(green_upstream_ref_name, None)
-
+    green_upstream_ref_name = branch.tested.branch.ref(git.REMOTE_ORIGIN)
     if branch.ref == green_upstream_ref_name:
         _logger.debug(f'Green: {green_upstream_ref_name!r} == {branch.ref!r}')
-        return
+        return False
+    return True
+
+
+def _green(gc: repo.Cache, branch: repo.Branch, last_success_sha: str):
+    assert branch.tested and branch.tested.branch
+    green_branch_name = branch.tested.branch
+    green_upstream_ref = gc.refs.get(green_branch_name.ref(git.REMOTE_ORIGIN), None)
 
     green_ref = _green_sync(gc, green_branch_name)
     green_sha = green_ref.sha if green_ref else None
 
-    jc = jenkins.Cache(ctx)
-    with jc.session() as ses:
-        branch_status_r = ses.get(jenkins.branch_url(branch.name, api=True))
-        branch_status_r.raise_for_status()
-        branch_status = branch_status_r.json()
-        for n in ('lastCompletedBuild', 'lastSuccessfulBuild', 'lastStableBuild'):
-            _logger.info('%s: %r -> %r', n, branch_status[n]['number'], branch_status[n]['url'])
-
-        last_successful_build_url = jenkins.api_url(branch_status['lastSuccessfulBuild']['url'])
-        last_successful_build_r = ses.get(last_successful_build_url)
-        last_successful_build_r.raise_for_status()
-        last_successful_build = last_successful_build_r.json()
-
-        last_success_action = None
-        for action in last_successful_build['actions']:
-            builds = action.get('buildsByBranchName')
-            if not builds:
-                continue
-            develop_build = builds.get(branch.name)
-            if not develop_build:
-                continue
-            last_success_action = develop_build
-            break
-
-        if not last_success_action:
-            raise Error('Last successful build not found')
-
-        last_success_sha = last_success_action['revision']['SHA1']
-
-        _logger.info('lastSuccessfulBuildSHA = %r', last_success_sha)
-
-        new_green_sha = last_success_sha
-
-        if new_green_sha not in gc.commits:
-            raise Error('Last tested commit not in repo. Run `jf sync`.')
-
-        # Do not move back
-        if green_sha and (new_green_sha in gc.commits) and gc.is_merged_into(new_green_sha, green_sha):
-            return
-
-        command.run(['git', 'branch', '--no-track', '--force', green_branch_name, new_green_sha])
-        if green_upstream_ref:
-            command.run([
-                'git', 'branch',
-                '--set-upstream-to={}'.format(green_upstream_ref.name),
-                green_branch_name,
-            ])
+    new_green_sha = git.Sha(last_success_sha)
+
+    if new_green_sha not in gc.commits:
+        raise Error('Last tested commit not in repo. Run `jf sync`.')
+
+    # Do not move back
+    if green_sha and (new_green_sha in gc.commits) and gc.is_merged_into(new_green_sha, green_sha):
+        return
+
+    command.run(['git', 'branch', '--no-track', '--force', green_branch_name, new_green_sha])
+    if green_upstream_ref:
+        command.run([
+            'git', 'branch',
+            '--set-upstream-to={}'.format(green_upstream_ref.name),
+            green_branch_name,
+        ])
 
 
 def _green_sync(gc: repo.Cache, branch_name: str, ref: git.Ref = None) -> t.Optional[git.Ref]:
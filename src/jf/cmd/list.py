@@ -1,7 +1,6 @@
 #!/usr/bin/python3
 # -*- mode: python; coding: utf-8 -*-
 
-import functools
 import typing as t
 
 import click
@@ -28,7 +27,7 @@ class ListLine:
 
     @property
     def current(self) -> str:
-        if self.b.ref == git.current_ref:
+        if self.b.ref == git.current_ref():
             return '>'
         return ' '
 
@@ -94,7 +93,6 @@ class ListLine:
     def stgit(self) -> str:
         return 's' if self.b.is_stgit else '.'
 
-    @functools.lru_cache(maxsize=None)
     def is_merged_into(self, m: t.Optional[git.Ref]) -> bool:
         return bool(m and m.is_valid and self.gc.is_merged_into(self.b.sha, m.sha))
 
@@ -112,6 +110,7 @@ def list_cmd(all):
     '''List branches.'''
 
     gc = repo.Cache()
+    gc.prefetch(commits=True)
 
     branches = list(gc.branches.values())
     maxlen = max(len(b.name) for b in branches)
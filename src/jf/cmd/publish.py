@@ -46,7 +46,7 @@ def publish(message: str, debug: bool, new: bool, local: bool, pr: bool, non_cle
 
     gc = repo.Cache()
 
-    branch_name = git.current_branch
+    branch_name = git.current_branch()
     if not branch_name:
         raise Error('HEAD is not a branch')
     branch = gc.branches[branch_name]
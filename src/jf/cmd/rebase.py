@@ -56,7 +56,7 @@ def rebase(ctx: click.Context, message: Optional[str], fork: Optional[str]):
 
     gc = repo.Cache()
 
-    branch_name = git.current_branch
+    branch_name = git.current_branch()
     if not branch_name:
         raise Error('HEAD is not a branch')
     branch = gc.branches[branch_name]
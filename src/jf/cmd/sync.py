@@ -28,12 +28,27 @@ def sync():
         command.run(['git', 'fetch', '--all', '--prune'])
 
         gc = repo.Cache()
+        gc.prefetch()
+        tracking = git.tracking_status()
+        checked_out = git.worktree_branches()
+        updates = []
         for b in gc.branches.values():
             if not b.sync:
                 continue
             upstream = b.upstream_resolved
             if not upstream:
                 continue
-            if gc.is_merged_into(upstream.sha, b.ref.sha):
+            tracked_upstream, mark = tracking.get(b.ref, (None, ''))
+            if tracked_upstream == upstream.name:
+                # Git already knows how the branch relates to its upstream.
+                if mark in ('=', '>'):
+                    continue
+            elif gc.is_merged_into(upstream.sha, b.ref.sha):
                 continue
-            command.run(['git', 'branch', '--force', '--no-track', b.name, upstream.name])
+            if b.ref.name in checked_out:
+                # `git branch` refuses to move a branch under another worktree.
+                command.run(['git', 'branch', '--force', '--no-track', b.name, upstream.name])
+                continue
+            updates.append((b.ref.name, upstream.sha, b.ref.sha))
+
+        git.update_refs(updates)
@@ -37,6 +37,19 @@ def full_run() -> bool:
     return _globals.full_run
 
 
+# jflow.run keeps its own copy: the legacy jflow package does not depend on jf.
+class _Cmdline(object):
+    '''Shell-quoted command line, built only if the log record is emitted.'''
+
+    __slots__ = ('cmds',)
+
+    def __init__(self, *cmds: t.List[str]) -> None:
+        self.cmds = cmds
+
+    def __str__(self) -> str:
+        return ' | '.join(' '.join(shlex.quote(s) for s in args) for args in self.cmds)
+
+
 def read(
         args: t.List[str],
         force=True,
@@ -58,6 +71,33 @@ def read(
     return _output_lines(p.stdout)
 
 
+def start(args: t.List[str], encoding=ENCODING) -> subprocess.Popen:
+    '''Starts a read-only command with piped output and returns without waiting.'''
+    _logger.debug('Run[yes]: %s', _Cmdline(args))
+    return subprocess.Popen(args, stdout=subprocess.PIPE, encoding=encoding)
+
+
+def stream(
+        args: t.List[str],
+        check=True,
+        encoding=ENCODING,
+        proc: t.Optional[subprocess.Popen] = None,
+) -> t.Iterator[str]:
+    '''Runs a read-only command and yields output lines as they are produced.
+
+    Parsing overlaps with the command's own work and the output is never held in
+    memory as a whole.  `proc` is the same command already launched by `start`.
+    '''
+    if proc is None:
+        proc = start(args, encoding=encoding)
+    with proc:
+        assert proc.stdout is not None
+        for line in proc.stdout:
+            yield line.rstrip('\n')
+    if check and proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, args)
+
+
 def run(
         args: t.List[str],
         force=False,
@@ -69,7 +109,7 @@ def run(
 ) -> subprocess.CompletedProcess:
     run = force or _globals.full_run
     run_str = 'yes' if run else 'skip'
-    _logger.debug('Run[%s]: %s', run_str, ' '.join(shlex.quote(s) for s in args))
+    _logger.debug('Run[%s]: %s', run_str, _Cmdline(args))
     if run:
         return subprocess.run(
             args,
@@ -92,7 +132,7 @@ def run_pipe(
 ) -> subprocess.CompletedProcess:
     run = force or _globals.full_run
     run_str = 'yes' if run else 'skip'
-    _logger.debug('Run[%s]: %s', run_str, ' | '.join(' '.join(shlex.quote(s) for s in args) for args in cmds))
+    _logger.debug('Run[%s]: %s', run_str, _Cmdline(*cmds))
 
     if run:
         proc = None
@@ -3,8 +3,6 @@
 
 from typing import List, Dict, Optional, Generator, Tuple
 
-import collections
-
 from jf import command
 from jf import git
 from jf import schema
@@ -131,15 +129,16 @@ class GitConfigHolder:
     def config(self) -> Dict[str, List[str]]:
         if self._config is not None:
             return self._config
-        self._config = collections.defaultdict(list)
+        config: Dict[str, List[str]] = {}
         for name, value in self._gen_config():
-            self._config[name].append(value)
-        return self._config
+            config.setdefault(name, []).append(value)
+        self._config = config
+        return config
 
     @staticmethod
     def _gen_config() -> Generator[Tuple[str, str], None, None]:
         for line in command.read(['git', 'config', '--list']):
-            name, value = line.split('=', 1)
+            name, _, value = line.partition('=')
             yield name, value
 
     def set(self, name: str, value: str) -> None:
@@ -158,10 +157,10 @@ class GitConfigHolder:
         command.run(['git', 'config', '--local', '--add', name, value])
         if self._config is None:
             return
-        self._config[name].append(value)
+        self._config.setdefault(name, []).append(value)
 
     def unset(self, name: str) -> None:
         command.run(['git', 'config', '--local', '--unset-all', name])
         if self._config is None:
             return
-        del self._config[name]
+        self._config.pop(name, None)
@@ -52,6 +52,36 @@ class Kind(enum.Enum):
     patch_log = enum.auto()
 
 
+# Second segment of 'refs/<category>/...' -> (kind, prefix to strip for short name)
+_CATEGORIES = {
+    'heads': (Kind.head, HEAD_PREFIX),
+    'tags': (Kind.tag, TAG_PREFIX),
+    'remotes': (Kind.remote, REMOTE_PREFIX),
+    'patches': (Kind.patch, GENERIC_PREFIX),
+}
+_OTHER_CATEGORY = (Kind.unknown, GENERIC_PREFIX)
+
+
+def parse_refname(ref_name: str) -> t.Tuple[Kind, str, str]:
+    '''Splits ref_name into (kind, prefix, short).
+
+    prefix is the longest of HEAD_PREFIX, TAG_PREFIX, REMOTE_PREFIX and
+    GENERIC_PREFIX that ref_name starts with, or '' if none; short is the rest.
+    '''
+    head, sep, rest = ref_name.partition('/')
+    if head != 'refs' or not sep:
+        return Kind.unknown, '', ref_name
+    category, sep, short = rest.partition('/')
+    kind, prefix = _CATEGORIES.get(category, _OTHER_CATEGORY) if sep else _OTHER_CATEGORY
+    if prefix == GENERIC_PREFIX:
+        short = rest
+    if kind is Kind.head and ref_name.endswith(STGIT_SUFFIX):
+        kind = Kind.stgit
+    elif kind is Kind.patch and ref_name.endswith(PATCH_LOG_SUFFIX):
+        kind = Kind.patch_log
+    return kind, prefix, short
+
+
 Sha = t.NewType('Sha', str)
 ZeroSha = Sha('')
 
@@ -72,11 +102,20 @@ class BranchName(str):
 ZeroBranchName = BranchName('')
 
 
+# (kind, short, remote, branch)
+_RefNameParts = t.Tuple[Kind, 'RefName', str, t.Optional[BranchName]]
+
+
 class RefName(str):
     '''Reference name manipulations.'''
 
+    __slots__ = ('_parts',)
+    _parts: t.Optional[_RefNameParts]
+
     def __new__(cls, name):
-        return super().__new__(cls, name)
+        v = super().__new__(cls, name)
+        v._parts = None
+        return v
 
     @property
     def is_valid(self) -> bool:
@@ -86,58 +125,55 @@ class RefName(str):
     def full(self) -> 'RefName':
         return RefName(self)
 
-    @functools.cached_property
+    @property
+    def _parsed(self) -> _RefNameParts:
+        '''Name parsed into (kind, short, remote, branch); computed on first use.'''
+        parts = self._parts
+        if parts is None:
+            parts = self._parts = self._parse()
+        return parts
+
+    def _parse(self) -> _RefNameParts:
+        kind, _, short_name = parse_refname(self)
+        short = RefName(short_name)
+        if kind is Kind.head or kind is Kind.stgit:
+            return kind, short, REMOTE_LOCAL, BranchName(short)
+        if kind is Kind.remote:
+            remote_name, _, branch_name = short.partition('/')
+            return kind, short, remote_name, BranchName(branch_name)
+        return kind, short, REMOTE_LOCAL, None
+
+    @property
     def short(self) -> 'RefName':
         '''Returns shortest valid abbreviation for full ref_name.'''
-        for prefix in (HEAD_PREFIX, TAG_PREFIX, REMOTE_PREFIX, GENERIC_PREFIX):
-            if self.startswith(prefix):
-                return RefName(self[len(prefix):])
-        return self
+        return self._parsed[1]
 
-    @functools.cached_property
+    @property
     def kind(self) -> Kind:
-        if self.startswith(HEAD_PREFIX):
-            if self.endswith(STGIT_SUFFIX):
-                return Kind.stgit
-            return Kind.head
-        if self.startswith(TAG_PREFIX):
-            return Kind.tag
-        if self.startswith(REMOTE_PREFIX):
-            return Kind.remote
-        if self.startswith(PATCH_PREFIX):
-            if self.endswith(PATCH_LOG_SUFFIX):
-                return Kind.patch_log
-            return Kind.patch
-        return Kind.unknown
-
-    @functools.cached_property
+        return self._parsed[0]
+
+    @property
     def is_remote(self) -> bool:
-        return self.kind == Kind.remote
+        return self._parsed[0] is Kind.remote
 
-    @functools.cached_property
+    @property
     def remote(self) -> str:
-        if self.kind == Kind.remote:
-            remote_name, _, _ = self.short.partition('/')
-            return remote_name
-        return REMOTE_LOCAL
+        return self._parsed[2]
 
     @property
     def is_branch(self) -> bool:
-        return self.kind in (Kind.head, Kind.stgit, Kind.remote)
+        return self._parsed[3] is not None
 
-    @functools.cached_property
+    @property
     def branch(self) -> t.Optional[BranchName]:
-        if self.kind in (Kind.head, Kind.stgit):
-            return BranchName(self.short)
-        if self.kind == Kind.remote:
-            _, _, branch_name = self.short.partition('/')
-            return BranchName(branch_name)
-        return None
+        return self._parsed[3]
 
 
 class Ref(RefName):
     '''Represents a reference in repo.'''
 
+    __slots__ = ('sha',)
+
     def __init__(self, name: str, sha: Sha) -> None:
         self.sha = sha
 
@@ -161,6 +197,8 @@ class Ref(RefName):
 
 
 class Commit(object):
+    __slots__ = ('sha', 'parents', 'children', 'refs')
+
     def __init__(self, sha: Sha, *, refs: t.List[RefName] = None):
         self.sha = sha
         self.parents: t.List[Sha] = []
@@ -178,17 +216,75 @@ class Commit(object):
         return 'Commit({})'.format(', '.join(args))
 
 
-def is_workdir_clean():
+@functools.lru_cache(maxsize=1)
+def is_workdir_clean() -> bool:
     return not command.read(['git', 'status', '--porcelain', '--untracked-files=no'])
 
 
+def invalidate_workdir_clean() -> None:
+    '''Drops cached workdir status.  Call after commands that modify workdir.'''
+    is_workdir_clean.cache_clear()
+
+
 def check_workdir_is_clean():
     if is_workdir_clean():
         return
     raise WorkdirIsNotCleanError()
 
 
-def _get_current_ref() -> t.Optional[str]:
+def tracking_status() -> t.Dict[RefName, t.Tuple[RefName, str]]:
+    '''Dictionary localBranchRef -> (upstreamRef, mark) for branches with git upstream.
+
+    Marks are from %(upstream:trackshort): '=' in sync, '>' ahead, '<' behind,
+    '<>' diverged.
+    '''
+    result = {}
+    fmt = '--format=%(refname) %(upstream) %(upstream:trackshort)'
+    for line in command.read(['git', 'for-each-ref', fmt, HEAD_PREFIX]):
+        ref_name, _, rest = line.partition(' ')
+        upstream, _, mark = rest.partition(' ')
+        if upstream and mark:
+            result[RefName(ref_name)] = (RefName(upstream), mark)
+    return result
+
+
+def peel(ref_name: str) -> Sha:
+    '''Object a chain of tags ends at, as `git show-ref --dereference` reports it.'''
+    return Sha(command.read(['git', 'rev-parse', f'{ref_name}^{{}}'])[0])
+
+
+def worktree_branches() -> t.Set[RefName]:
+    '''Full names of branches checked out in any worktree.'''
+    prefix = 'branch '
+    return {
+        RefName(line[len(prefix):])
+        for line in command.read(['git', 'worktree', 'list', '--porcelain'])
+        if line.startswith(prefix)
+    }
+
+
+def update_refs(updates: t.Iterable[t.Tuple[str, str, t.Optional[str]]]) -> None:
+    '''Moves refs in a single transaction.
+
+    `updates` are (refName, newSha, oldSha) triples; when oldSha is set the ref is
+    moved only if it still points there.  Unlike `git branch --force`, this also
+    moves a branch checked out in a worktree, so callers skip those.
+    '''
+    batch = ''.join(
+        'update {}\0{}\0{}\0'.format(ref_name, new_sha, old_sha or '')
+        for ref_name, new_sha, old_sha in updates
+    )
+    if not batch:
+        return
+    command.run(['git', 'update-ref', '--stdin', '-z'], input=batch)
+
+
+@functools.lru_cache(maxsize=None)
+def current_ref() -> t.Optional[str]:
+    '''Full name of the checked out ref, or HEAD SHA if it is detached.
+
+    Computed on first use and kept for the rest of the process.
+    '''
     cmd = ['git', 'symbolic-ref', '--quiet', 'HEAD']
     p = subprocess.run(cmd, stdout=subprocess.PIPE, check=False, encoding=command.ENCODING, universal_newlines=True)
     if p.stdout:
@@ -202,24 +298,23 @@ def _get_current_ref() -> t.Optional[str]:
     return None
 
 
-current_ref = _get_current_ref()
-
-
-def _get_current_branch() -> t.Optional[str]:
-    if not current_ref:
+@functools.lru_cache(maxsize=None)
+def current_branch() -> t.Optional[str]:
+    ref_name = current_ref()
+    if not ref_name:
         return None
-    return RefName(current_ref).branch
-
-
-current_branch = _get_current_branch()
+    return RefName(ref_name).branch
 
 
 @contextlib.contextmanager
 def detach_head():
+    current_branch_name = current_branch()
     try:
-        if current_branch:
+        if current_branch_name:
             command.run(['git', 'checkout', '--detach', 'HEAD'])
-        yield current_branch
+            invalidate_workdir_clean()
+        yield current_branch_name
     finally:
-        if current_branch:
-            command.run(['git', 'checkout', current_branch])
+        if current_branch_name:
+            command.run(['git', 'checkout', current_branch_name])
+            invalidate_workdir_clean()
@@ -5,15 +5,17 @@
 
 import typing as t
 
-import contextlib
 import functools
 import logging
 import os.path
 import pathlib
+import threading
 import urllib.parse as up
 
 import click
 import requests
+import requests.adapters
+from urllib3.util import retry
 
 
 _logger = logging.getLogger(__name__)
@@ -31,16 +33,22 @@ PREFIX = 'https://api-jenkins.joomdev.net/job/api/job/api-tests/job/'
 API_SUFFIX = 'api/json/'
 DEFAULT_CRED_PATH = os.path.expanduser('~/.secret/jenkins.cred')
 
+# (connect, read) timeouts for Jenkins requests, seconds.
+TIMEOUT = (3, 10)
+
 
 def api_url(u):
     return up.urljoin(u, API_SUFFIX)
 
 
+@functools.lru_cache(maxsize=256)
 def quote(bn):
-    bn = up.quote(bn, safe='')
-    return up.quote(bn, safe='')
+    # Jenkins multibranch job names are the URL-encoded branch names, so the
+    # job path is encoded twice.  Quoting again only turns '%' into '%25'.
+    return up.quote(bn, safe='').replace('%', '%25')
 
 
+@functools.lru_cache(maxsize=256)
 def branch_url(branch, api=False):
     r = '{}{}/'.format(
         PREFIX,
@@ -51,6 +59,13 @@ def branch_url(branch, api=False):
     return r
 
 
+@functools.lru_cache(maxsize=None)
+def _read_cred(path: str) -> t.Tuple[str, str]:
+    '''Reads USER:PASSWORD credentials file once per process.'''
+    user, _, password = pathlib.Path(path).read_text().rstrip().partition(':')
+    return (user, password)
+
+
 def options(f: t.Callable[..., t.Any]) -> t.Callable[..., t.Any]:
     return (
         click.option('--jenkins-auth',
@@ -62,14 +77,45 @@ def options(f: t.Callable[..., t.Any]) -> t.Callable[..., t.Any]:
 class Cache:
     def __init__(self, ctx: click.Context):
         self.ctx = ctx
+        self._session: t.Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
 
     @functools.cached_property
     def auth(self):
-        user, _, password = pathlib.Path(self.ctx.params['jenkins_auth']).read_text().rstrip().partition(':')
-        return (user, password)
-
-    @contextlib.contextmanager
-    def session(self):
-        with requests.Session() as ses:
-            ses.auth = self.auth
-            yield ses
+        return _read_cred(self.ctx.params.get('jenkins_auth') or DEFAULT_CRED_PATH)
+
+    @property
+    def session(self) -> requests.Session:
+        '''Session shared by all requests, so connections are reused.
+
+        Created on first use under a lock, so worker threads get the same one.
+        '''
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._new_session()
+            return self._session
+
+    def _new_session(self) -> requests.Session:
+        ses = requests.Session()
+        ses.auth = self.auth
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=retry.Retry(total=3, backoff_factor=0.3),
+        )
+        ses.mount('https://', adapter)
+        ses.mount('http://', adapter)
+        return ses
+
+    def get_json(self, url: str, tree: t.Optional[str] = None) -> t.Any:
+        '''Gets parsed JSON from Jenkins API.
+
+        `tree` is Jenkins' field selector; it keeps responses small.
+        '''
+        r = self.session.get(url, params={'tree': tree} if tree else None, timeout=TIMEOUT)
+        r.raise_for_status()
+        return r.json()
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
@@ -1,14 +1,12 @@
 #!/usr/bin/python3
 # -*- mode: python; coding: utf-8 -*-
 
-from typing import List, Dict, Optional, Tuple, Generator
+from typing import List, Dict, Iterable, Optional, Set, Tuple, Generator
 
-import collections
 import enum
 import functools
 import logging
-
-from dsapy.algs import bdfs
+import subprocess
 
 from jf import branch
 from jf import command
@@ -101,65 +99,50 @@ class Branch(branch.Generic):
 
         result: List[PatchInfo] = []
 
+        refs = self.gc.refs
         patch_prefix = git.PATCH_PREFIX + self.name + '/'
-        patch_lines = command.read(['stg', 'series', '--all', '--branch={}'.format(self.name)])
+        patch_lines = command.read(['stg', 'series', '--all', f'--branch={self.name}'])
         for line in patch_lines:
-            mark, patch_name = line.split(' ', 1)
+            mark, _, patch_name = line.partition(' ')
             status = PatchStatus.from_stg_mark(mark)
-            patch_ref = self.gc.refs[git.RefName(patch_prefix + patch_name)]
-            patch_log_ref = self.gc.refs[git.RefName(patch_prefix + patch_name + git.PATCH_LOG_SUFFIX)]
+            patch_ref = refs[git.RefName(patch_prefix + patch_name)]
+            patch_log_ref = refs[git.RefName(patch_prefix + patch_name + git.PATCH_LOG_SUFFIX)]
             result.append(PatchInfo(patch_ref, patch_log_ref, status))
 
         return result
 
-    @functools.cached_property
-    def review_resolved(self) -> Optional[git.Ref]:
-        ref_name = self.review
+    def _resolve(self, ref_name: Optional[git.RefName]) -> Optional[git.Ref]:
         if not ref_name:
             return None
         return self.gc.refs.get(ref_name, None)
 
+    @functools.cached_property
+    def review_resolved(self) -> Optional[git.Ref]:
+        return self._resolve(self.review)
+
     @functools.cached_property
     def public_resolved(self) -> Optional[git.Ref]:
-        ref_name = self.public
-        if not ref_name:
-            return None
-        return self.gc.refs.get(ref_name, None)
+        return self._resolve(self.public)
 
     @functools.cached_property
     def debug_resolved(self) -> Optional[git.Ref]:
-        ref_name = self.debug
-        if not ref_name:
-            return None
-        return self.gc.refs.get(ref_name, None)
+        return self._resolve(self.debug)
 
     @functools.cached_property
     def ldebug_resolved(self) -> Optional[git.Ref]:
-        ref_name = self.ldebug
-        if not ref_name:
-            return None
-        return self.gc.refs.get(ref_name, None)
+        return self._resolve(self.ldebug)
 
     @functools.cached_property
     def fork_resolved(self) -> Optional[git.Ref]:
-        ref_name = self.fork
-        if not ref_name:
-            return None
-        return self.gc.refs.get(ref_name, None)
+        return self._resolve(self.fork)
 
     @functools.cached_property
     def upstream_resolved(self) -> Optional[git.Ref]:
-        ref_name = self.upstream
-        if not ref_name:
-            return None
-        return self.gc.refs.get(ref_name, None)
+        return self._resolve(self.upstream)
 
     @functools.cached_property
     def tested_resolved(self) -> Optional[git.Ref]:
-        ref_name = self.tested
-        if not ref_name:
-            return None
-        return self.gc.refs.get(ref_name, None)
+        return self._resolve(self.tested)
 
     def publish_local_public(
             self, msg: str = None, force_new=False,
@@ -184,6 +167,7 @@ class Branch(branch.Generic):
             cmd.append(f'--message={msg}')
         cmd.append(self.public.branch)
         command.run(cmd)
+        git.invalidate_workdir_clean()
         return self.public, self.review
 
     def publish_local_debug(
@@ -210,6 +194,7 @@ class Branch(branch.Generic):
             cmd.append(f'--message={msg}')
         cmd.append(self.ldebug.branch)
         command.run(cmd)
+        git.invalidate_workdir_clean()
         return self.ldebug, self.debug
 
     def publish_local(self, msg: str = None, force_new=False) -> Tuple[Optional[git.RefName], Optional[git.RefName]]:
@@ -219,14 +204,61 @@ class Branch(branch.Generic):
 class Cache(object):
     def __init__(self, cfg: config.Root = None):
         self.cfg = cfg or config.Root()
+        self._started: Dict[Tuple[str, ...], subprocess.Popen] = {}
+        self._merged: Dict[Tuple[git.Sha, git.Sha], bool] = {}
+        self._ancestors: Dict[git.Sha, Tuple[Set[git.Sha], List[git.Sha]]] = {}
+        self._shortcuts: Dict[str, Optional[git.Ref]] = {}
+
+    def prefetch(self, commits: bool = False) -> None:
+        '''Starts loading refs, and with `commits` the whole history, in background.
+
+        The git commands run concurrently; their output is consumed by `refs_list`
+        and `commits` when these are first accessed.  Only commands that read
+        `commits` should prefetch them: a started history listing also makes
+        `is_merged_into` walk it instead of asking `git merge-base`.
+        '''
+        cmds = [_FOR_EACH_REF_CMD, _REV_LIST_CMD] if commits else [_FOR_EACH_REF_CMD]
+        for args in cmds:
+            if tuple(args) not in self._started:
+                self._started[tuple(args)] = command.start(args)
+
+    def _stream(self, args: List[str]) -> Generator[str, None, None]:
+        yield from command.stream(args, proc=self._started.pop(tuple(args), None))
 
     @property
     def remote(self) -> str:
         return self.cfg.jf.remote.value or git.REMOTE_ORIGIN
 
+    def _load_refs(self) -> None:
+        '''Reads all refs once and fills every ref index from the same pass.
+
+        Results are stored directly into the instance dict, where the cached
+        properties below would have put them.
+        '''
+        refs_list: List[git.Ref] = []
+        abbrevs: Dict[git.RefName, List[git.Ref]] = {}
+        by_branch: Dict[git.BranchName, List[git.Ref]] = {}
+        heads: List[git.Ref] = []
+        for ref in gen_refs(self._stream(_FOR_EACH_REF_CMD)):
+            refs_list.append(ref)
+            for abbrev in ref_abbrevs(ref.name):
+                abbrevs.setdefault(abbrev, []).append(ref)
+            branch_name = ref.branch
+            if branch_name:
+                by_branch.setdefault(branch_name, []).append(ref)
+            if ref.kind is git.Kind.head:
+                heads.append(ref)
+        self.__dict__.update(
+            refs_list=refs_list,
+            refs_abbrevs=abbrevs,
+            refs_by_branch=by_branch,
+            head_refs=heads,
+        )
+
     @functools.cached_property
     def refs_list(self) -> List[git.Ref]:
-        return list(gen_refs())
+        self._load_refs()
+        return self.__dict__['refs_list']
 
     @functools.cached_property
     def refs_abbrevs(self) -> Dict[git.RefName, List[git.Ref]]:
@@ -237,11 +269,20 @@ class Cache(object):
         There can be conflicts, so a single abbrevName may correspond to a more than
         one reference.
         '''
-        refs = collections.defaultdict(list)
-        for ref in self.refs_list:
-            for abbrev in ref_abbrevs(ref.name):
-                refs[abbrev].append(ref)
-        return dict(refs)
+        self._load_refs()
+        return self.__dict__['refs_abbrevs']
+
+    @functools.cached_property
+    def refs_by_branch(self) -> Dict[git.BranchName, List[git.Ref]]:
+        '''Dictionary branchName -> [refs] for local and remote branches.'''
+        self._load_refs()
+        return self.__dict__['refs_by_branch']
+
+    @functools.cached_property
+    def head_refs(self) -> List[git.Ref]:
+        '''Local branch heads, StGit metadata refs excluded.'''
+        self._load_refs()
+        return self.__dict__['head_refs']
 
     @functools.cached_property
     def refs(self) -> Dict[git.RefName, git.Ref]:
@@ -268,7 +309,8 @@ class Cache(object):
 
         commits = {}
         commit = None
-        for line in command.read(['git', 'rev-list', '--all', '--pretty=format:parents% P%nrefs% D']):
+        refs_get = self.refs.get
+        for line in self._stream(_REV_LIST_CMD):
             key, _, value = line.partition(' ')
             if not value:
                 continue
@@ -280,22 +322,21 @@ class Cache(object):
                     raise Error('Unknown commit')
                 commit.parents = [git.Sha(v) for v in value.split(' ')]
             elif key == 'refs':
+                if not commit:
+                    raise Error('Unknown commit')
                 refs = []
-                for r in value.split(', '):
+                rest = value
+                while rest:
+                    r, _, rest = rest.partition(', ')
                     sname, _, rname = r.partition(' -> ')
-                    rr = git.RefName(rname or sname)
+                    rr = rname or sname
                     if rr.startswith(_TAG_P):
-                        rr = git.RefName(git.TAG_PREFIX + r[len(_TAG_P):])
-                    if rr not in self.refs:
-                        _logger.debug(
-                            (f'Missing reference: {rr!r} <- {r!r}\n'
-                             '  line: {line!r}\n'
-                             '  value:  {value!r}\n'
-                             '  at {commit!r}'))
+                        rr = git.TAG_PREFIX + rr[len(_TAG_P):]
+                    ref = refs_get(git.RefName(rr))
+                    if ref is None:
+                        _logger.debug('Missing reference: %r <- %r\n  line: %r\n  at %r', rr, r, line, commit)
                     else:
-                        refs.append(self.refs[rr].name)
-                if not commit:
-                    raise Error('Unknown commit')
+                        refs.append(ref.name)
                 commit.refs = refs
 
         for commit in commits.values():
@@ -306,11 +347,7 @@ class Cache(object):
 
     @functools.cached_property
     def branch_by_ref(self) -> Dict[git.RefName, Branch]:
-        all_heads = {}
-        for ref in self.refs_list:
-            if ref.kind != git.Kind.head:
-                continue
-            all_heads[ref.name] = Branch(self, ref)
+        all_heads = {ref.name: Branch(self, ref) for ref in self.head_refs}
 
         branch_refs = all_heads.copy()
         for k, b in all_heads.items():
@@ -331,61 +368,85 @@ class Cache(object):
     def branches(self) -> Dict[str, Branch]:
         return {b.name: b for b in self.branch_by_ref.values()}
 
-    @functools.lru_cache(maxsize=None)
-    def resolve_shortcut(self, shortcut: str) -> Optional[git.Ref]:
-        matches = set()
-        shortcut_ref = git.RefName(shortcut)
+    def resolve_shortcut(self, shortcut: Optional[str]) -> Optional[git.Ref]:
+        if not shortcut:
+            return None
+        if shortcut in self._shortcuts:
+            return self._shortcuts[shortcut]
 
+        matches = set()
         if shortcut.endswith(SHORTCUT_SUFFIX):
             prefix = shortcut[:-len(SHORTCUT_SUFFIX)]
-            for r in self.refs_list:
-                if not r.branch:
-                    continue
-                if r.branch.startswith(prefix):
-                    matches.add(r)
+            for branch_name, refs in self.refs_by_branch.items():
+                if branch_name.startswith(prefix):
+                    matches.update(refs)
         else:
-            matches.update(self.refs_abbrevs.get(shortcut_ref, []))
-            for r in self.refs_list:
-                if not r.branch:
-                    continue
-                if r.branch == shortcut:
-                    matches.add(r)
-
-        if not matches:
-            return None
-        return max(matches, key=lambda r: (r.branch, not r.is_remote))
+            matches.update(self.refs_abbrevs.get(git.RefName(shortcut), []))
+            matches.update(self.refs_by_branch.get(git.BranchName(shortcut), []))
+
+        result = max(matches, key=lambda r: (r.branch, not r.is_remote)) if matches else None
+        self._shortcuts[shortcut] = result
+        return result
 
     @functools.cached_property
     def current_ref(self) -> git.Ref:
-        if not git.current_ref:
+        ref_name = git.current_ref()
+        if not ref_name:
             raise Error('Not in git repo')
-        return self.get_ref(git.current_ref)
+        return self.get_ref(ref_name)
 
     def is_merged_into(self, parent_sha: Optional[git.Sha], child_sha: Optional[git.Sha]) -> bool:
         if not parent_sha or not child_sha:
             return False
+        if parent_sha == child_sha:
+            return True
 
-        start = [parent_sha]
+        key = (parent_sha, child_sha)
+        merged = self._merged.get(key)
+        if merged is not None:
+            return merged
 
-        def exits(c):
-            return self.commits[c].children
+        if 'commits' in self.__dict__ or tuple(_REV_LIST_CMD) in self._started:
+            merged = self._is_ancestor(parent_sha, child_sha)
+        else:
+            p = command.run(['git', 'merge-base', '--is-ancestor', parent_sha, child_sha], force=True, check=False)
+            merged = p.returncode == 0
+        self._merged[key] = merged
+        return merged
+
+    def _is_ancestor(self, parent_sha: git.Sha, child_sha: git.Sha) -> bool:
+        '''Walks parents up from child_sha over loaded commits.
 
-        for commit_sha in bdfs.dfs(start, exits):
-            if commit_sha == child_sha:
+        The walk state is kept per child, so later queries for the same child resume
+        it instead of starting over.
+        '''
+        walk = self._ancestors.get(child_sha)
+        if walk is None:
+            walk = self._ancestors[child_sha] = ({child_sha}, [child_sha])
+        seen, stack = walk
+        if parent_sha in seen:
+            return True
+
+        commits_get = self.commits.get
+        while stack:
+            commit = commits_get(stack.pop())
+            if commit is None:
+                continue
+            for sha in commit.parents:
+                if sha not in seen:
+                    seen.add(sha)
+                    stack.append(sha)
+            if parent_sha in seen:
                 return True
         return False
 
 
 def ref_abbrevs(ref_name: git.RefName) -> List[git.RefName]:
     '''Builds valid abbreviation for full ref_name.'''
-    result = []
-    for prefix in (git.HEAD_PREFIX, git.TAG_PREFIX, git.REMOTE_PREFIX, git.GENERIC_PREFIX):
-        if ref_name.startswith(prefix):
-            short = ref_name[len(prefix):]
-            for p in _gen_prefixes(prefix):
-                result.append(git.RefName(p+short))
-            break
-    return result or [ref_name]
+    _, prefix, short = git.parse_refname(ref_name)
+    if not prefix:
+        return [ref_name]
+    return [git.RefName(p + short) for p in _ABBREV_PREFIXES[prefix]]
 
 
 def _gen_prefixes(full_prefix: str) -> Generator[git.RefName, None, None]:
@@ -397,29 +458,38 @@ def _gen_prefixes(full_prefix: str) -> Generator[git.RefName, None, None]:
     yield git.RefName(p)
 
 
-_DEREFERENCE_SUFFIX = '^{}'
+# Full prefix -> all its abbreviations.
+_ABBREV_PREFIXES: Dict[str, List[str]] = {
+    prefix: list(_gen_prefixes(prefix))
+    for prefix in (git.HEAD_PREFIX, git.TAG_PREFIX, git.REMOTE_PREFIX, git.GENERIC_PREFIX)
+}
+
 
+_HEAD_CMD = ['git', 'rev-parse', 'HEAD']
+# Tags are peeled to the object they point to: %(*objecttype) and %(*objectname)
+# are empty for other refs.  Only one level is peeled, see gen_refs.
+_FOR_EACH_REF_CMD = ['git', 'for-each-ref', '--format=%(objectname) %(*objecttype) %(*objectname) %(refname)']
+_REV_LIST_CMD = ['git', 'rev-list', '--all', '--pretty=format:parents% P%nrefs% D']
 
-def gen_refs() -> Generator[git.Ref, None, None]:
-    '''Generates all refs in repo.'''
-    refs_dict = {}
 
-    head = 'HEAD'
-    head_sha = git.Sha(command.read(['git', 'rev-parse', head])[0])
-    yield git.Ref(head, head_sha)
+def gen_refs(ref_lines: Optional[Iterable[str]] = None) -> Generator[git.Ref, None, None]:
+    '''Generates all refs in repo.
 
-    suffix_len = len(_DEREFERENCE_SUFFIX)
-    for line in command.read(['git', 'show-ref', '--dereference']):
-        sha_str, _, name = line.partition(' ')
-        sha = git.Sha(sha_str)
+    `ref_lines` is the output of `_FOR_EACH_REF_CMD` if it is already running.
+    Otherwise it is started together with the HEAD lookup.
+    '''
+    head_proc = command.start(_HEAD_CMD)
+    if ref_lines is None:
+        ref_lines = command.stream(_FOR_EACH_REF_CMD, proc=command.start(_FOR_EACH_REF_CMD))
 
-        new_name = name
-        deref = name.endswith(_DEREFERENCE_SUFFIX)
-        if deref:
-            new_name = name[:-suffix_len]
-            refs_dict[new_name] = sha
-        elif new_name not in refs_dict:
-            refs_dict[new_name] = sha
+    head_sha = git.Sha(list(command.stream(_HEAD_CMD, proc=head_proc))[0])
+    yield git.Ref('HEAD', head_sha)
 
-    for name, sha in refs_dict.items():
-        yield git.Ref(name, sha)
+    for line in ref_lines:
+        sha, _, rest = line.partition(' ')
+        peeled_type, _, rest = rest.partition(' ')
+        peeled_sha, _, name = rest.partition(' ')
+        if peeled_type == 'tag':
+            # A tag of a tag: rare enough to peel the rest of the chain separately.
+            peeled_sha = git.peel(name)
+        yield git.Ref(name, git.Sha(peeled_sha or sha))
@@ -16,8 +16,8 @@ Strip = collections.namedtuple('Strip', ['s', 'ok'])
 
 def strip_suffix(suffix, s):
     if suffix and s.endswith(suffix):
-        return Strip(s=s[:len(suffix)], ok=True)
-    return Strip(s=s, ok=False)
+        return s[:-len(suffix)]
+    return s
 
 
 def strip_prefix(prefix, s):
@@ -41,13 +41,13 @@ def ensure_prefix(prefix, s):
 def iter_output_lines(output):
     if hasattr(output, 'split'):
         return iter(output.split())
-    return (strip_suffix('\n', line).s for line in output)
+    return (strip_suffix('\n', line) for line in output)
 
 
 def output_lines(output):
     if hasattr(output, 'splitlines'):
         return output.splitlines()
-    return [strip_suffix('\n', line).s for line in output]
+    return [strip_suffix('\n', line) for line in output]
 
 
 def mark_first(it):
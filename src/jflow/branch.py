@@ -3,8 +3,8 @@
 
 """Branch class."""
 
+import concurrent.futures
 import logging
-import re
 
 import jflow
 from jflow import common
@@ -16,25 +16,32 @@ from jflow import run
 _logger = logging.getLogger(__name__)
 
 
-class Branch(object):
-    FOR_EACH_REF_SEP = re.compile('\\s+')
+# Module-level copies of Branch constants: Branch.make runs once per ref, and
+# globals are found faster than class attributes.
+_PREFIX_HEAD = 'refs/heads/'
+_PREFIX_REMOTE = 'refs/remotes/'
+_PREFIX_PATCH = 'refs/patches/'
+
+_SUFFIX_STGIT = '.stgit'
+_SUFFIX_LOG = '.log'
+_SUFFIX_LOCAL = '.local'
 
-    PREFIX_HEAD = 'refs/heads/'
-    PREFIX_REMOTE = 'refs/remotes/'
-    PREFIX_PATCH = 'refs/patches/'
 
-    SUFFIX_STGIT = '.stgit'
-    SUFFIX_LOG = '.log'
-    SUFFIX_LOCAL = '.local'
+class Branch(object):
+    # One instance per ref, so keep them small.
+    __slots__ = (
+        'remote', 'branch', 'patch', 'sha',
+        'log', 'stgit', 'remotes', 'patches', 'public',
+        'is_log', 'is_local', 'is_stgit', 'ref_full', '_full_ref',
+    )
 
-    RE_REF = re.compile('(?P<prefix>{head}|{remote}|{patch})(?P<name>.*)$'.format(
-        head=PREFIX_HEAD,
-        remote=PREFIX_REMOTE,
-        patch=PREFIX_PATCH,
-    ))
-    RE_REMOTE = re.compile('(?P<remote>[^/]+)/(?P<name>.*)$')
-    RE_PATCH = re.compile('(?P<branch>.*)/(?P<patch>[^/]+)$')
+    PREFIX_HEAD = _PREFIX_HEAD
+    PREFIX_REMOTE = _PREFIX_REMOTE
+    PREFIX_PATCH = _PREFIX_PATCH
 
+    SUFFIX_STGIT = _SUFFIX_STGIT
+    SUFFIX_LOG = _SUFFIX_LOG
+    SUFFIX_LOCAL = _SUFFIX_LOCAL
 
     def __init__(self, remote=None, branch=None, patch=None, sha=None, log=None, stgit=None, remotes=None, patches=None, public=None, is_log=False, is_local=False, is_stgit=False, ref_full=None):
         self.remote = remote # Remote name (None for local branches)
@@ -52,38 +59,33 @@ class Branch(object):
         self.is_local = is_local # Is this branch a local branch
         self.is_stgit = is_stgit # Is this branch an stgit metadata branch
         self.ref_full = ref_full # Full ref name
+        self._full_ref = self._make_ref(branch, remote=remote, patch=patch, is_log=is_log, is_local=is_local, is_stgit=is_stgit)
 
     @classmethod
     def make(cls, ref_name, ref_hash=None):
-        m = cls.RE_REF.match(ref_name)
-        if not m:
-            return None
-
-        prefix = m.group('prefix')
         remote = None
-        branch = m.group('name')
         patch = None
         is_log = False
         is_local = False
         is_stgit = False
 
-        if prefix == cls.PREFIX_REMOTE:
-            mr = cls.RE_REMOTE.match(branch)
-            if not mr:
-                return
-            remote = mr.group('remote')
-            branch = mr.group('name')
-        elif prefix == cls.PREFIX_PATCH:
-            mr = cls.RE_PATCH.match(branch)
-            if not mr:
-                return
-            branch = mr.group('branch')
-            patch = mr.group('patch')
-            if patch.endswith(cls.SUFFIX_LOG):
-                patch, is_log = jflow.strip_suffix(cls.SUFFIX_LOG, patch)
-
-        branch, is_stgit = jflow.strip_suffix(cls.SUFFIX_STGIT, branch)
-        branch, is_local = jflow.strip_suffix(cls.SUFFIX_LOCAL, branch)
+        if ref_name.startswith(_PREFIX_HEAD):
+            branch = ref_name[len(_PREFIX_HEAD):]
+        elif ref_name.startswith(_PREFIX_REMOTE):
+            remote, sep, branch = ref_name[len(_PREFIX_REMOTE):].partition('/')
+            if not remote or not sep:
+                return None
+        elif ref_name.startswith(_PREFIX_PATCH):
+            branch, sep, patch = ref_name[len(_PREFIX_PATCH):].rpartition('/')
+            if not sep or not patch:
+                return None
+            is_log = patch.endswith(_SUFFIX_LOG)
+            if is_log:
+                patch = patch[:-len(_SUFFIX_LOG)]
+        else:
+            return None
+
+        branch, is_stgit, is_local = cls._peel(branch)
 
         r = cls(
             remote=remote, branch=branch, patch=patch,
@@ -95,44 +97,63 @@ class Branch(object):
         )
         return r
 
+    @classmethod
+    def _peel(cls, branch):
+        '''Strips .stgit and then .local suffixes: (branch, is_stgit, is_local).'''
+        is_stgit = branch.endswith(_SUFFIX_STGIT)
+        if is_stgit:
+            branch = branch[:-len(_SUFFIX_STGIT)]
+        is_local = branch.endswith(_SUFFIX_LOCAL)
+        if is_local:
+            branch = branch[:-len(_SUFFIX_LOCAL)]
+        return branch, is_stgit, is_local
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
     def __repr__(self):
-        return repr(self.__dict__)
+        return repr(self.as_dict())
 
-    def full_ref(self):
-        prefix = self.PREFIX_HEAD
-        remote = ''
-        if self.remote:
-            prefix = self.PREFIX_REMOTE
-            remote = self.remote + '/'
-        elif self.patch:
-            prefix = self.PREFIX_PATCH
-
-        branch = self.branch
-        if self.is_local:
-            branch += self.SUFFIX_LOCAL
-        if self.is_stgit:
-            branch += self.SUFFIX_STGIT
+    @classmethod
+    def _make_ref(cls, branch, remote=None, patch=None, is_log=False, is_local=False, is_stgit=False):
+        if branch is None:
+            return None
+        prefix = cls.PREFIX_HEAD
+        remote_part = ''
+        if remote:
+            prefix = cls.PREFIX_REMOTE
+            remote_part = remote + '/'
+        elif patch:
+            prefix = cls.PREFIX_PATCH
 
-        patch = ''
-        if self.patch:
-            patch = '/' + self.patch
+        if is_local:
+            branch += cls.SUFFIX_LOCAL
+        if is_stgit:
+            branch += cls.SUFFIX_STGIT
 
-        if self.is_log:
-            patch += self.SUFFIX_LOG
+        patch_part = ''
+        if patch:
+            patch_part = '/' + patch
 
-        return prefix + remote + branch + patch
+        if is_log:
+            patch_part += cls.SUFFIX_LOG
+
+        return prefix + remote_part + branch + patch_part
+
+    def full_ref(self):
+        return self._full_ref
 
     def _get_parent_ref(self):
         if self.remote:
-            return Branch(branch=self.branch, patch=self.patch, is_local=self.is_local, is_stgit=self.is_stgit, is_log=self.is_log).full_ref(), 'remote'
+            return self._make_ref(self.branch, patch=self.patch, is_local=self.is_local, is_stgit=self.is_stgit, is_log=self.is_log), 'remote'
         if self.is_log:
-            return Branch(branch=self.branch, patch=self.patch, is_local=self.is_local, is_stgit=self.is_stgit).full_ref(), 'log'
+            return self._make_ref(self.branch, patch=self.patch, is_local=self.is_local, is_stgit=self.is_stgit), 'log'
         if self.patch:
-            return Branch(branch=self.branch, is_local=self.is_local, is_stgit=self.is_stgit).full_ref(), 'patch'
+            return self._make_ref(self.branch, is_local=self.is_local, is_stgit=self.is_stgit), 'patch'
         if self.is_stgit:
-            return Branch(branch=self.branch, is_local=self.is_local).full_ref(), 'stgit'
+            return self._make_ref(self.branch, is_local=self.is_local), 'stgit'
         elif self.is_local:
-            return Branch(branch=self.branch).full_ref(), 'local'
+            return self._make_ref(self.branch), 'local'
         return None, None
 
     def _connect_parent(self, p, pt):
@@ -157,7 +178,7 @@ class Controller(run.Cmd):
     Branch = Branch
 
     def branch_iter_heads(self):
-        refs = (self.Branch.FOR_EACH_REF_SEP.split(line) for line in self.cmd_output(['git', 'for-each-ref']))
+        refs = (line.split(None, 2) for line in self.cmd_output_iter(['git', 'for-each-ref']))
         for ref_hash, ref_type, ref_name in refs:
             if ref_type != 'commit':
                 continue
@@ -166,8 +187,14 @@ class Controller(run.Cmd):
                 continue
             yield b
 
-    def branch_iter_tree(self):
-        bs = {b.full_ref(): b for b in self.branch_iter_heads()}
+    def branch_iter_tree(self, name=None):
+        '''Yields root branches; with `name` only of that branch and its versions.'''
+        heads = self.branch_iter_heads()
+        if name:
+            # Related refs share the base branch name, so filtering keeps the tree intact.
+            prefix = name + '/'
+            heads = (b for b in heads if b.branch == name or b.branch.startswith(prefix))
+        bs = {b.full_ref(): b for b in heads}
         skip = set()
         for b in bs.values():
             pr, pt = b._get_parent_ref()
@@ -175,8 +202,8 @@ class Controller(run.Cmd):
             if not pb:
                 continue
             skip.add(b._connect_parent(pb, pt))
-        for b in bs.values():
-            if b.full_ref() not in skip:
+        for ref, b in bs.items():
+            if ref not in skip:
                 yield b
 
     @staticmethod
@@ -187,19 +214,34 @@ class Controller(run.Cmd):
             return False
         return a < b
 
-    def branch_resolve(self, name, heads=None):
+    @staticmethod
+    def branch_index(heads):
+        '''Groups heads by every name they resolve from: name -> [(versionKey, branch)].'''
+        index = {}
+        for b in heads:
+            name = b.branch
+            # An exact match is keyed by the name itself, as strip_prefix used to leave it.
+            index.setdefault(name, []).append((name, b))
+            pos = name.find('/')
+            while pos >= 0:
+                index.setdefault(name[:pos], []).append((name[pos + 1:], b))
+                pos = name.find('/', pos + 1)
+        return index
+
+    def branch_resolve(self, name, heads=None, index=None):
         if not name:
             return None
-        if heads is None:
-            heads = self.branch_iter_tree()
-        prefix = name + '/'
+        if index is not None:
+            candidates = index.get(name, ())
+        else:
+            if heads is None:
+                heads = self.branch_iter_tree(name)
+            candidates = self.branch_index(heads).get(name, ())
         resolved_key = None
         resolved = None
-        for b in heads:
-            branch_key, prefixed = jflow.strip_prefix(prefix, b.branch)
-            if prefixed or b.branch == name:
-                if self.branch_version_less(resolved_key, branch_key):
-                    resolved_key, resolved = branch_key, b
+        for branch_key, b in candidates:
+            if self.branch_version_less(resolved_key, branch_key):
+                resolved_key, resolved = branch_key, b
         return resolved
 
 
@@ -214,11 +256,12 @@ class TreeBuilder(git.Git, run.Cmd):
 
     LIST_PATTERNS = [HEAD_PAT, REMOTE_PAT, PATCH_PAT]
 
-    HEAD_RE = re.compile('refs/heads/(?P<name>.*)')
-    REMOTE_RE = re.compile('refs/remotes/(?P<remote>[^/]+)/(?P<name>.*)')
-    TAG_RE = re.compile('refs/tags/(?P<name>.*)')
-    PATCH_RE = re.compile('refs/patches/(?P<name>.*)/(?P<patch>[^/]+)')
-    PATCHLOG_RE = re.compile('refs/patches/(?P<name>.*)/(?P<patch>[^/]+)(?P<log>\.log)')
+    HEAD_PREFIX = 'refs/heads/'
+    REMOTE_PREFIX = 'refs/remotes/'
+    PATCH_PREFIX = 'refs/patches/'
+    LOG_SUFFIX = '.log'
+
+    STGIT_WORKERS = 8
 
     MARK_STATUS = {
         '+': 'applied',
@@ -228,27 +271,37 @@ class TreeBuilder(git.Git, run.Cmd):
     }
 
     def parse_ref(self, ref):
-        for fmt, r in (('branch', self.HEAD_RE), ('remote', self.REMOTE_RE), ('patchlog', self.PATCHLOG_RE), ('patch', self.PATCH_RE)):
-            m = r.match(ref)
-            if not m:
-                continue
-            d = m.groupdict()
-            d['fmt'] = fmt
-            return d
+        if ref.startswith(self.HEAD_PREFIX):
+            return {'fmt': 'branch', 'name': ref[len(self.HEAD_PREFIX):]}
+        if ref.startswith(self.REMOTE_PREFIX):
+            remote, sep, name = ref[len(self.REMOTE_PREFIX):].partition('/')
+            if not remote or not sep:
+                return {}
+            return {'fmt': 'remote', 'remote': remote, 'name': name}
+        if ref.startswith(self.PATCH_PREFIX):
+            name, sep, patch = ref[len(self.PATCH_PREFIX):].rpartition('/')
+            if not sep or not patch:
+                return {}
+            if patch.endswith(self.LOG_SUFFIX) and len(patch) > len(self.LOG_SUFFIX):
+                return {'fmt': 'patchlog', 'name': name, 'patch': patch[:-len(self.LOG_SUFFIX)], 'log': self.LOG_SUFFIX}
+            return {'fmt': 'patch', 'name': name, 'patch': patch}
         return {}
 
     def for_each_ref(self):
-        for_each_ref_out = self.cmd_output(['git', 'for-each-ref', '--format=%(refname)'] + self.LIST_PATTERNS)
-        for ref in for_each_ref_out:
+        for ref in self.cmd_output_iter(['git', 'for-each-ref', '--format=%(refname)'] + self.LIST_PATTERNS):
             r = common.Struct(ref=ref, merged=False)
             r.update(self.parse_ref(ref))
             yield r
 
     def merged_refs(self, merged_to):
-        return self.cmd_output(['git', 'for-each-ref', '--format=%(refname)', '--merged={}'.format(merged_to)])
+        return self.cmd_output_iter(['git', 'for-each-ref', '--format=%(refname)', '--merged={}'.format(merged_to)])
 
-    def stgit_patches(self, b, refs):
-        patch_lines = self.cmd_output(['stg', 'series', '--all', '--branch={}'.format(b.name)])
+    def stgit_series(self, b):
+        return self.cmd_output(['stg', 'series', '--all', '--branch={}'.format(b.name)])
+
+    def stgit_patches(self, b, refs, patch_lines=None):
+        if patch_lines is None:
+            patch_lines = self.stgit_series(b)
         for line in patch_lines:
             mark, patch_name = line.split(' ', 1)
             status = self.MARK_STATUS[mark]
@@ -271,23 +324,34 @@ class TreeBuilder(git.Git, run.Cmd):
                 yield p, b.upstream
 
     def branch_tree(self):
-        refs = {r.ref:r for r in self.for_each_ref()}
-        branches = {r.name:r for r in refs.values() if r.fmt == 'branch'}
-        remotes = {r.name:r for r in refs.values() if r.fmt == 'remote'}
+        refs = {}
+        branches = {}
+        remotes = {}
+        for r in self.for_each_ref():
+            refs[r.ref] = r
+            fmt = r.fmt
+            if fmt == 'branch':
+                branches[r.name] = r
+            elif fmt == 'remote':
+                remotes[r.name] = r
+
+        cfg = self.git_config_dict()
 
-        cfg = dict(self.git_config_values())
+        keys = {name: config.BranchKeys(name) for name in branches}
 
         # Attach branch config
         for b in branches.values():
+            prefix = keys[b.name].prefix
             jflow_cfg = {}
             for k, v in cfg.items():
-                sk, ok = jflow.strip_prefix(config.branch_key_base(b.name) + '.', k)
+                sk, ok = jflow.strip_prefix(prefix, k)
                 if not ok:
                     continue
                 jflow_cfg[sk] = v
             b.jflow_cfg = jflow_cfg
 
         # Attach .stgit branches to their parents
+        stgit_bs = []
         for b in list(branches.values()):
             key = config.branch_key_stgit_version(b.name)
             if key not in cfg:
@@ -297,25 +361,28 @@ class TreeBuilder(git.Git, run.Cmd):
             if stgit_b is None:
                 continue
             b.stgit = stgit_b
-            b.patches = list(self.stgit_patches(b, refs))
+            stgit_bs.append(b)
+
+        # StGit lists one branch per call, so run them side by side
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.STGIT_WORKERS) as pool:
+            for b, patch_lines in zip(stgit_bs, pool.map(self.stgit_series, stgit_bs)):
+                b.patches = list(self.stgit_patches(b, refs, patch_lines))
 
         # Find jflow branches
         for b in list(branches.values()):
-            key = config.branch_key_version(b.name)
-            b.jflow = (key in cfg)
+            b.jflow = (keys[b.name].version in cfg)
 
         # Attach related branches to jflow
         for b in list(branches.values()):
-            remote_key = config.branch_key_remote(b.name)
-            remote_name = cfg.get(remote_key)
+            bk = keys[b.name]
+            remote_name = cfg.get(bk.remote)
             remote_b = remotes.pop(remote_name, None)
             if remote_b is None:
                 remote_b = remotes.pop(b.name, None)
             if remote_b is not None:
                 b.remote = remote_b
 
-            public_key = config.branch_key_public(b.name)
-            public_name = cfg.get(public_key)
+            public_name = cfg.get(bk.public)
             if public_name != b.name:
                 public_b = branches.pop(public_name, None)
                 if public_b is not None:
@@ -323,14 +390,12 @@ class TreeBuilder(git.Git, run.Cmd):
             else:
                 b.self_public = True
 
-            debug_key = config.branch_key_debug(b.name)
-            debug_name = cfg.get(debug_key)
+            debug_name = cfg.get(bk.debug)
             debug_b = remotes.pop(debug_name, None)
             if debug_b is not None:
                 b.debug = debug_b
 
-            upstream_key = config.branch_key_upstream(b.name)
-            upstream_name = cfg.get(upstream_key)
+            upstream_name = cfg.get(bk.upstream)
             upstream_b = branches.get(upstream_name, None) or remotes.get(upstream_name, None)
             if upstream_b is not None:
                 b.upstream = upstream_b
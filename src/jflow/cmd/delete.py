@@ -50,12 +50,20 @@ class DeleteCmd(branch.TreeBuilder, app.Command):
         for arg_branch in self.flags.branch:
             if arg_branch == current_ref:
                 raise Error('Cannot delete current branch')
-            for b in branches.values():
-                if b.name == arg_branch:
-                    tree_branches[arg_branch] = b
-                    break
-            if arg_branch not in tree_branches:
+            b = branches.get(arg_branch)
+            if b is None:
                 raise Error('Branch %r not found', arg_branch)
+            tree_branches[arg_branch] = b
+
+        # Delete all remote branches with a single push, before touching anything local.
+        # dict.fromkeys drops duplicate refspecs and keeps the branch order.
+        remote_deletes = dict.fromkeys(
+            f':{rb.name}'
+            for cb in tree_branches.values() if cb.jflow
+            for rb in (cb.debug, cb.remote) if rb
+        )
+        if remote_deletes:
+            self.cmd_action(['git', 'push', 'origin'] + list(remote_deletes))
 
         for arg_branch in self.flags.branch:
             cb = tree_branches[arg_branch]
@@ -63,12 +71,6 @@ class DeleteCmd(branch.TreeBuilder, app.Command):
             if cb.jflow:
                 self.cmd_action(['git', 'config', '--remove-section', config.branch_key_base(cb.name)])
 
-                if cb.debug:
-                    self.cmd_action(['git', 'push', 'origin', ':{b.name}'.format(b=cb.debug)])
-
-                if cb.remote:
-                    self.cmd_action(['git', 'push', 'origin', ':{b.name}'.format(b=cb.remote)])
-
                 if cb.public:
                     self.cmd_action(['git', 'branch', '--delete', '--force', cb.public.name])
 
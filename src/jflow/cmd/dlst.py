@@ -73,12 +73,11 @@ class Kind(enum.Enum):
 
 
 def gen_abbrevs(ref_name):
-    for prefix in (HEAD_PREFIX, TAG_PREFIX, REMOTE_PREFIX, GENERIC_PREFIX):
+    for prefix, abbrev_prefixes in _ABBREVS:
         if ref_name.startswith(prefix):
             short = ref_name[len(prefix):]
-            for p in _gen_prefixes(prefix):
-                yield p+short
-            break
+            return [p+short for p in abbrev_prefixes]
+    return []
 
 
 def _gen_prefixes(full_prefix):
@@ -89,6 +88,13 @@ def _gen_prefixes(full_prefix):
     yield p
 
 
+# (prefix, its abbreviations) in matching order, computed once.
+_ABBREVS = tuple(
+    (prefix, tuple(_gen_prefixes(prefix)))
+    for prefix in (HEAD_PREFIX, TAG_PREFIX, REMOTE_PREFIX, GENERIC_PREFIX)
+)
+
+
 def ref_short(ref_name):
     for prefix in (HEAD_PREFIX, TAG_PREFIX, REMOTE_PREFIX, GENERIC_PREFIX):
         if ref_name.startswith(prefix):
@@ -155,7 +161,7 @@ class CommitTree(run.Cmd):
 
     def gen_refs(self):
         refs = {}
-        for line in self.cmd_output(['git', 'show-ref']):
+        for line in self.cmd_output_iter(['git', 'show-ref']):
             sha, name = line.split(' ')
             ref = Ref(name, sha)
             refs[ref.name] = ref
@@ -195,7 +201,7 @@ class CommitTree(run.Cmd):
         refs_dict = self.get_abbrevs()
 
         commit = None
-        for line in self.cmd_output(['git', 'rev-list', '--all', '--pretty=format:parents% P%nrefs% D']):
+        for line in self.cmd_output_iter(['git', 'rev-list', '--all', '--pretty=format:parents% P%nrefs% D']):
             key = line.split(' ', 1)
             if len(key) != 2:
                 continue
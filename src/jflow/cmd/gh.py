@@ -4,7 +4,6 @@
 """Open branch in GitHub."""
 
 import logging
-import re
 
 from dsapy import app
 
@@ -37,8 +36,6 @@ class GitHubCmd(publish.ParamsMixin, git.Git, app.Command):
             help='Only print URL, do not open a browser',
         )
 
-    REMOTE_RE = re.compile('(?:https://)?github\\.com[:/](?P<repo>.*?)(?:\.git)?$')
-
     def main(self):
         p = self.params(
             need_url=True,
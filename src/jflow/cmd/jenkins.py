@@ -3,13 +3,12 @@
 
 """Open jenkins build page."""
 
-import urllib.parse as up
-
 from dsapy import app
 from dsapy import flag
 
 from jflow import config
 from jflow import git
+from jflow import green
 from jflow import run
 
 
@@ -33,18 +32,16 @@ class Jenkins(git.Git, run.Cmd, app.Command):
         parser.add_argument(
             'branch',
             nargs='?',
-            default=cls.git_current_ref(short=True),
-            help='Branch to operate on',
+            help='Branch to operate on, current branch by default',
         )
 
     def main(self):
-        ref = self.flags.branch
+        ref = self.flags.branch or self.git_current_ref(short=True)
         if self.flags.debug:
             ref = self.git_config_get(config.branch_key_debug(ref))
         else:
             ref = self.git_config_get_default(config.branch_key_remote(ref), ref)
-        ref_escaped = up.quote(up.quote(ref, safe=''), safe='')
-        url = '{}{}'.format(self.BRANCH_BASE_URL, ref_escaped)
+        url = f'{self.BRANCH_BASE_URL}{green.jenkins_quote(ref)}'
         self.cmd_action(['xdg-open', url])
 
 
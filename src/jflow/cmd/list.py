@@ -63,7 +63,8 @@ class ListCmd(branch.TreeBuilder, app.Command):
         if b.merged:
             r.merged = 'M'
 
-        r.name = ' {c.W}{b.name}{c.N}'.format(c=color.Colors, b=b)
+        c = color.Colors
+        r.name = f' {c.W}{b.name}{c.N}'
 
         def patches(status):
             return [p for p in b.patches if p.status == status]
@@ -93,8 +94,5 @@ class ListCmd(branch.TreeBuilder, app.Command):
         branches = self.branch_tree()
 
         for b in branches.values():
-            print('{m.typ}{m.public}{m.remote}{m.debug}{m.merged}{m.name}{m.patches}{m.description}'.format(
-                b=b,
-                m=self.branch_marks(b),
-                c=color.Colors,
-            ))
+            m = self.branch_marks(b)
+            print(f'{m.typ}{m.public}{m.remote}{m.debug}{m.merged}{m.name}{m.patches}{m.description}')
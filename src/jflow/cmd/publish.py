@@ -4,7 +4,6 @@
 """Publish a branch."""
 
 import logging
-import re
 
 from dsapy import app
 
@@ -46,8 +45,6 @@ class Publish(publish.ParamsMixin, git.Git, app.Command):
             help='Create PR',
         )
 
-    REMOTE_RE = re.compile('(?:https://)?github\\.com[:/](?P<repo>.*?)(?:\.git)?$')
-
     def main(self):
         p = self.params(
             local=self.flags.local,
@@ -61,10 +58,8 @@ class Publish(publish.ParamsMixin, git.Git, app.Command):
 
         self.cmd_action([
             'git', 'push', '--force', p.remote_name,
-            '{public}:{remote}'.format(
-                public=p.public_branch_name,
-                remote=p.remote_branch_name,
-            )])
+            f'{p.public_branch_name}:{p.remote_branch_name}',
+        ])
 
         if not self.flags.pr or p.debug:
             return
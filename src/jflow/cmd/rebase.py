@@ -21,10 +21,9 @@ _logger = logging.getLogger(__name__)
 
 class CleanMixin(run.Cmd):
     def clean(self):
-        self.cmd_action_pipe([
-            ['git', 'ls-files', '--others', '--directory', '--exclude-standard'],
-            ['xargs', 'rm', '--recursive', '--force', '--verbose'],
-        ])
+        # Same set as `ls-files --others --directory --exclude-standard`; the
+        # second --force also removes untracked nested repositories.
+        self.cmd_action(['git', 'clean', '-d', '--force', '--force'])
 
 
 class Clean(CleanMixin, app.Command):
@@ -64,46 +63,47 @@ class Rebase(sync.SyncMixin, CleanMixin, publish.ToolsMixin, branch.Controller,
             self.sync()
 
         branch = self.git_current_ref(short=True)
-        branch_conf = {
-            v.key():v.value
-            for v in self.git_config_get_regex(
-                    config.make_prefix(config.branch_key_base(branch)),
-                    None,
-            )
-        }
+        bk = config.BranchKeys(branch)
+        branch_conf = dict(self.git_config_get_prefix(bk.prefix))
 
         public_branch = self.public_branch(branch)
         need_publish = public_branch and self.git_branch_exists(public_branch)
         if need_publish:
             self.publish_local(branch, public_branch)
 
-        heads = list(self.branch_iter_tree())
+        index = self.branch_index(self.branch_iter_tree())
 
         upstream_name = branch_conf.get(config.KEY_UPSTREAM)
         fork_name = branch_conf.get(config.KEY_FORK)
 
-        upstream_b = self.branch_resolve(upstream_name, heads=heads)
-        fork_b = self.branch_resolve(fork_name, heads=heads)
+        upstream_b = self.branch_resolve(upstream_name, index=index)
+        fork_b = self.branch_resolve(fork_name, index=index)
 
         new_upstream_b = upstream_b
         new_fork_b = fork_b
         if self.flags.upstream is not None:
-            new_upstream_b = self.branch_resolve(self.flags.upstream, heads=heads)
+            new_upstream_b = self.branch_resolve(self.flags.upstream, index=index)
             if self.flags.fork is None and upstream_b == fork_b:
                 new_fork_b = new_upstream_b
         if self.flags.fork is not None:
-            new_fork_b = self.branch_resolve(self.flags.fork, heads=heads)
+            new_fork_b = self.branch_resolve(self.flags.fork, index=index)
 
         if new_fork_b != fork_b:
-            self.git_config_set(config.branch_key_fork(branch), new_fork_b.branch)
+            self.git_config_set(bk.fork, new_fork_b.branch)
         if new_upstream_b != upstream_b:
-            self.git_config_set(config.branch_key_upstream(branch), new_upstream_b.branch)
+            self.git_config_set(bk.upstream, new_upstream_b.branch)
 
-        self.cmd_action(['stg', 'rebase', '--merged', new_fork_b.full_ref()])
-        self.cmd_action(['git', 'clean', '-d', '--force'])
+        sha_before = self.git_rev_parse('HEAD') if need_publish else None
+
+        # A stack already based on the fork tip would only be popped and pushed back.
+        if self.cmd_output(['stg', 'id', '{base}'])[0] != new_fork_b.sha:
+            self.cmd_action(['stg', 'rebase', '--merged', new_fork_b.full_ref()])
+        else:
+            _logger.info('Already based on %s', new_fork_b.full_ref())
         self.clean()
 
-        if need_publish:
+        # A rebase that did not move the branch leaves nothing new to publish.
+        if need_publish and self.git_rev_parse('HEAD') != sha_before:
             self.publish_local(branch, public_branch)
 
 
@@ -74,29 +74,21 @@ class Start(sync.SyncMixin, branch.Controller, git.Git, run.Cmd, app.Command):
             self.sync()
 
         name = self.flags.name
-        matches = []  # A list of matched template names
-        for v in self.git_config_get_regex(
-                config.make_prefix(config.TEMPLATE_KEY_PREFIX),
-                config.make_suffix(config.KEY_VERSION),
-        ):
-            key = v.key()
-            if name.startswith(key):
-                matches.append(key)
+        templates = {v.key() for v in self.git_config_get_regex(
+            config.TEMPLATE_PREFIX,
+            config.make_suffix(config.KEY_VERSION),
+        )}
+        # Matched template names, shortest first: probe each prefix of the name.
+        matches = [name[:i] for i in range(len(name) + 1) if name[:i] in templates]
         if not matches:
             raise Error('Prefix not found')
-        matches.sort(key=len)
 
         prefix = matches[-1]
         base = name[len(prefix):]
 
-        tv = {
-            v.key(): v.value
-            for k in matches
-            for v in self.git_config_get_regex(
-                    config.make_prefix(config.TEMPLATE_KEY_PREFIX, k),
-                    None,
-            )
-        }
+        tv = {}
+        for k in matches:
+            tv.update(self.git_config_get_prefix(config.make_prefix(config.TEMPLATE_KEY_PREFIX, k)))
 
         version = tv.get(config.KEY_VERSION, 1)
 
@@ -121,15 +113,15 @@ class Start(sync.SyncMixin, branch.Controller, git.Git, run.Cmd, app.Command):
             ps=tv.get(config.KEY_REMOTE_SUFFIX, ''),
         )
 
-        heads = list(self.branch_iter_tree())
-        upstream_b = self.branch_resolve(self.flags.upstream or tv.get(config.KEY_UPSTREAM), heads=heads)
+        index = self.branch_index(self.branch_iter_tree())
+        upstream_b = self.branch_resolve(self.flags.upstream or tv.get(config.KEY_UPSTREAM), index=index)
         if not upstream_b:
             raise Error('No upstream branch found')
 
         fork_b = upstream_b
         fork_ref = self.flags.fork or tv.get(config.KEY_FORK)
         if fork_ref:
-            fork_b = self.branch_resolve(fork_ref, heads=heads)
+            fork_b = self.branch_resolve(fork_ref, index=index)
             if not fork_b:
                 raise Error('Branch {!r} not found'.format(fork_ref))
 
@@ -137,14 +129,15 @@ class Start(sync.SyncMixin, branch.Controller, git.Git, run.Cmd, app.Command):
         self.cmd_action(['stg', 'new', '--message=WIP', 'wip'])
         self.cmd_action(['git', 'branch', '--set-upstream-to={}'.format(upstream_b.full_ref())])
 
-        self.git_config_set(config.branch_key_version(name), version)
-        self.git_config_set(config.branch_key_public(name), public)
-        self.git_config_set(config.branch_key_debug(name), debug)
-        self.git_config_set(config.branch_key_debug_prefix(name), debug_prefix)
-        self.git_config_set(config.branch_key_debug_suffix(name), debug_suffix)
-        self.git_config_set(config.branch_key_remote(name), remote)
-        self.git_config_set(config.branch_key_upstream(name), upstream_b.branch)
-        self.git_config_set(config.branch_key_fork(name), fork_b.branch)
+        bk = config.BranchKeys(name)
+        self.git_config_set(bk.version, version)
+        self.git_config_set(bk.public, public)
+        self.git_config_set(bk.debug, debug)
+        self.git_config_set(bk.debug_prefix, debug_prefix)
+        self.git_config_set(bk.debug_suffix, debug_suffix)
+        self.git_config_set(bk.remote, remote)
+        self.git_config_set(bk.upstream, upstream_b.branch)
+        self.git_config_set(bk.fork, fork_b.branch)
 
 
 if __name__ == '__main__':
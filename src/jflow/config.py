@@ -7,6 +7,7 @@ VERSION=1
 
 TEMPLATE_KEY_PREFIX = 'jflow.template'
 SEPARATOR_KEY = '.'
+TEMPLATE_PREFIX = TEMPLATE_KEY_PREFIX + SEPARATOR_KEY
 
 KEY_VERSION = 'version'
 KEY_FORK = 'fork'
@@ -86,6 +87,29 @@ def branch_key_merge_to(b):
     return make_key(branch_key_base(b), KEY_MERGE_TO)
 
 
+class BranchKeys(object):
+    '''Config keys of a jflow branch, built once per branch.'''
+
+    __slots__ = (
+        'base', 'prefix', 'version', 'fork', 'upstream', 'public', 'debug',
+        'debug_prefix', 'debug_suffix', 'remote', 'extra', 'merge_to',
+    )
+
+    def __init__(self, b):
+        self.base = branch_key_base(b)
+        p = self.prefix = self.base + SEPARATOR_KEY
+        self.version = p + KEY_VERSION
+        self.fork = p + KEY_FORK
+        self.upstream = p + KEY_UPSTREAM
+        self.public = p + KEY_PUBLIC
+        self.debug = p + KEY_DEBUG
+        self.debug_prefix = p + KEY_DEBUG_PREFIX
+        self.debug_suffix = p + KEY_DEBUG_SUFFIX
+        self.remote = p + KEY_REMOTE
+        self.extra = p + KEY_EXTRA
+        self.merge_to = p + KEY_MERGE_TO
+
+
 def branch_key_stgit_version(b):
     return make_key('branch', b, 'stgit', 'stackformatversion')
 
@@ -3,7 +3,6 @@
 
 import contextlib
 import os
-import re
 import subprocess
 
 import jflow
@@ -18,16 +17,61 @@ class Error(Exception):
 # git rev-list --pretty='format:parents %P%nrefs %D%n%-B' --all
 
 class Git(run.Cmd):
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+
+        # Output of read-only git queries, keyed by command.  Any action may move
+        # HEAD or rewrite config, so actions drop it.
+        self._git_memo = {}
+
+    def _git_read(self, args, check=True):
+        key = tuple(args)
+        try:
+            lines, ret = self._git_memo[key]
+        except KeyError:
+            lines, ret = self._git_memo[key] = self.cmd_output_ret(args, check=False)
+        if check and ret:
+            raise subprocess.CalledProcessError(ret, args)
+        return lines
+
+    def cmd_action(self, args, check=True, input=None):
+        self._git_memo.clear()
+        return super().cmd_action(args, check=check, input=input)
+
+    def cmd_action_pipe(self, cmds):
+        self._git_memo.clear()
+        return super().cmd_action_pipe(cmds)
+
     @classmethod
     def git_config_list_names(cls):
         return cls.cmd_output(['git', 'config', '--name-only', '--list'])
 
     @classmethod
     def git_config_values(cls):
-        for line in cls.cmd_output(['git', 'config', '--list']):
-            name, value = line.split('=', 1)
+        # NUL-separated `name\nvalue` records survive values with '=' or newlines.
+        for record in cls.cmd_output_z(['git', 'config', '--list', '-z']):
+            name, _, value = record.partition('\n')
             yield name, value
 
+    def git_config_items(self):
+        '''(name, value) pairs of the whole config in `git config --list` order.
+
+        Read once and reused by all git_config_get* until the next action.
+        '''
+        try:
+            return self._git_memo['config']
+        except KeyError:
+            items = self._git_memo['config'] = list(self.git_config_values())
+            return items
+
+    def git_config_dict(self):
+        '''All config values by key; last value wins like `git config --get`.'''
+        try:
+            return self._git_memo['config_dict']
+        except KeyError:
+            cfg = self._git_memo['config_dict'] = dict(self.git_config_items())
+            return cfg
+
     def git_config_set(self, key, value):
         self.cmd_action(['git', 'config', '--local', '--replace-all', str(key), str(value)])
 
@@ -41,61 +85,62 @@ class Git(run.Cmd):
         for value in values[1:]:
             self.git_config_add(key, value)
 
-    @classmethod
-    def git_config_get(cls, key):
-        for value in cls.cmd_output(['git', 'config', '--get', str(key)]):
-            # Only return first value
-            return value
+    def git_config_get(self, key):
+        key = str(key)
+        cfg = self.git_config_dict()
+        if key not in cfg:
+            # Same failure as `git config --get` for a missing key.
+            raise subprocess.CalledProcessError(1, ['git', 'config', '--get', key])
+        return cfg[key]
 
-    @classmethod
-    def git_config_get_default(cls, key, default=None):
+    def git_config_get_default(self, key, default=None):
         try:
-            return cls.git_config_get(key)
+            return self.git_config_get(key)
         except subprocess.CalledProcessError as e:
             if e.returncode == 1:
                 return default
             raise
 
-    @classmethod
-    def git_config_get_multi(cls, key):
-        return cls.cmd_output(['git', 'config', '--get-all', str(key)])
-
-    @classmethod
-    def git_config_get_regex(cls, prefix, suffix):
-        regex_items = []
-        if prefix is not None:
-            regex_items.append('^' + re.escape(prefix))
-        regex_items.append('(.*)')
-        if suffix is not None:
-            regex_items.append(re.escape(suffix) + '$')
-        regex = ''.join(regex_items)
-        r = re.compile(regex)
-        for line in cls.cmd_output(['git', 'config', '--get-regex', str(regex)]):
-            name, value = line.split(' ', 1)
-            m = r.match(name)
-            if not m:
+    def git_config_get_multi(self, key):
+        key = str(key)
+        values = [v for name, v in self.git_config_items() if name == key]
+        if not values:
+            raise subprocess.CalledProcessError(1, ['git', 'config', '--get-all', key])
+        return values
+
+    def git_config_get_regex(self, prefix, suffix):
+        prefix = prefix or ''
+        suffix = suffix or ''
+        min_len = len(prefix) + len(suffix)
+        for name, value in self.git_config_items():
+            if len(name) < min_len or not name.startswith(prefix) or not name.endswith(suffix):
                 continue
-            yield Value(name, value, key=m.group(1))
+            yield Value(name, value, key=name[len(prefix):len(name) - len(suffix)])
 
-    @classmethod
-    def _git_current_ref(cls, symbolic=True, short=False):
+    def git_config_get_prefix(self, prefix):
+        '''Yields (key, value) for config names starting with `prefix`, key without it.'''
+        plen = len(prefix)
+        for name, value in self.git_config_items():
+            if name.startswith(prefix):
+                yield name[plen:], value
+
+    def _git_current_ref(self, symbolic=True, short=False):
         cmd = ['git', 'rev-parse']
         if symbolic:
             cmd.append('--symbolic-full-name')
         if short:
             cmd.append('--abbrev-ref' if symbolic else '--short')
         cmd.append('HEAD')
-        refs = cls.cmd_output(cmd)
+        refs = self._git_read(cmd)
         if len(refs) != 1:
             raise Error('Unexpected git output: %r', refs)
         return refs[0]
 
-    @classmethod
-    def git_current_ref(cls, short=False):
-        ref = cls._git_current_ref(symbolic=True, short=short)
+    def git_current_ref(self, short=False):
+        ref = self._git_current_ref(symbolic=True, short=short)
         if ref != 'HEAD':
             return ref
-        return cls._git_current_ref(symbolic=False, short=short)
+        return self._git_current_ref(symbolic=False, short=short)
 
     @classmethod
     def git_workdir_is_clean(cls):
@@ -106,6 +151,20 @@ class Git(run.Cmd):
         if not cls.git_workdir_is_clean():
             raise Error('Workdir is not clean')
 
+    @classmethod
+    def git_rev_parse(cls, rev):
+        return cls.cmd_output(['git', 'rev-parse', '--verify', rev])[0]
+
+    @classmethod
+    def git_worktree_branches(cls):
+        '''Full names of branches checked out in any worktree.'''
+        prefix = 'branch '
+        return {
+            line[len(prefix):]
+            for line in cls.cmd_output(['git', 'worktree', 'list', '--porcelain'])
+            if line.startswith(prefix)
+        }
+
     @classmethod
     def git_branch_exists(cls, b):
         _, ret = cls.cmd_output_ret(['git', 'rev-parse', '--verify', b], check=False)
@@ -4,6 +4,7 @@
 """Update green-develop."""
 
 import contextlib
+import functools
 import json
 import logging
 import pathlib
@@ -31,6 +32,12 @@ class Error(Exception):
 JENKINS_PREFIX = 'https://api-jenkins.joomdev.net/job/api/job/api-tests/job/'
 JENKINS_API_SUFFIX = 'api/json/'
 
+# `tree` filter for the branch status: only the builds green() logs.
+BRANCH_STATUS_TREE = ','.join(
+    '{}[number,url]'.format(n)
+    for n in ('lastCompletedBuild', 'lastSuccessfulBuild', 'lastStableBuild')
+)
+
 GREEN_DEVELOP="tested/develop"
 GREEN_DEVELOP_UPSTREAM="origin/tested/develop"
 
@@ -39,9 +46,17 @@ def jenkins_api_url(u):
     return up.urljoin(u, JENKINS_API_SUFFIX)
 
 
+@functools.lru_cache(maxsize=None)
+def read_cred(path):
+    '''Reads USER:PASSWORD credentials file once per process.'''
+    user, password = pathlib.Path(path).expanduser().read_text().strip().split(':')
+    return (user, password)
+
+
 def jenkins_quote(bn):
-    bn = up.quote(bn, safe='')
-    return up.quote(bn, safe='')
+    # Job names are URL-encoded branch names, so the path is encoded twice;
+    # the second pass only has to escape '%'.
+    return up.quote(bn, safe='').replace('%', '%25')
 
 
 def jenkins_branch_url(branch, api=False):
@@ -66,8 +81,7 @@ class Mixin(git.Git, run.Cmd):
         )
 
     def jenkins_auth(self):
-        user, password = pathlib.Path(self.flags.jenkins_auth).expanduser().read_text().strip().split(':')
-        return (user, password)
+        return read_cred(self.flags.jenkins_auth)
 
 
     @contextlib.contextmanager
@@ -79,7 +93,7 @@ class Mixin(git.Git, run.Cmd):
 
     def green(self):
         with self.jenkins_session() as ses:
-            branch_status_r = ses.get(jenkins_branch_url('develop', True))
+            branch_status_r = ses.get(jenkins_branch_url('develop', True), params={'tree': BRANCH_STATUS_TREE})
             branch_status_r.raise_for_status()
             branch_status = branch_status_r.json()
             for n in ('lastCompletedBuild', 'lastSuccessfulBuild', 'lastStableBuild'):  # , 'lastBuild', 'lastFailedBuild', 'lastUnstableBuild', 'lastUnsuccessfulBuild'):
@@ -9,7 +9,6 @@ import re
 from dsapy import app
 
 import jflow
-from jflow import common
 from jflow import config
 from jflow import git
 from jflow import run
@@ -26,10 +25,30 @@ class Error(Exception):
         return cls(fmt % tuple(args))
 
 
+class Params(object):
+    '''Publish parameters of a branch; fields that were not computed are None.'''
+
+    __slots__ = (
+        'debug', 'current_branch', 'public_branch_name', 'remote_name',
+        'remote_branch_name', 'upstream_branch_name', 'remote_url', 'pr_url',
+    )
+
+    def __init__(self, **kw):
+        for k in self.__slots__:
+            setattr(self, k, kw.pop(k, None))
+        if kw:
+            raise TypeError('Unknown params: {}'.format(', '.join(kw)))
+
+    def __repr__(self):
+        return 'Params({})'.format(', '.join(
+            '{}={!r}'.format(k, getattr(self, k)) for k in self.__slots__
+        ))
+
+
 class ToolsMixin(git.Git, run.Cmd):
     def public_branch(self, branch=None):
         branch = branch or self.git_current_ref(short=True)
-        return self.git_config_get(config.branch_key_public(branch))
+        return self.git_config_dict().get(config.branch_key_public(branch))
 
     def publish_local(self, current_branch, public_branch, force_new=False):
         if current_branch == public_branch:
@@ -40,6 +59,8 @@ class ToolsMixin(git.Git, run.Cmd):
 
 
 class ParamsMixin(ToolsMixin):
+    REMOTE_RE = re.compile('(?:https://)?github\\.com[:/](?P<repo>.*?)(?:\\.git)?$')
+
     @classmethod
     def add_arguments(cls, parser):
         super().add_arguments(parser)
@@ -51,7 +72,7 @@ class ParamsMixin(ToolsMixin):
         )
 
     def params(self, current_branch=None, local=False, pr=False, expand=True, need_url=False):
-        p = common.Struct(
+        p = Params(
             debug=self.flags.debug,
         )
 
@@ -61,22 +82,29 @@ class ParamsMixin(ToolsMixin):
             p.public_branch_name = p.current_branch
         else:
             p.public_branch_name = self.public_branch(p.current_branch)
+            if p.public_branch_name is None:
+                raise Error.new('No public branch configured for %r', p.current_branch)
 
         if local:
             return p
 
         # TODO(diseaz): take origin of the upstream branch upstream.
         p.remote_name = 'origin'
+        cfg = self.git_config_dict()
         if p.debug:
-            p.remote_branch_name = self.git_config_get(config.branch_key_debug(p.current_branch))
+            p.remote_branch_name = cfg.get(config.branch_key_debug(p.current_branch))
+            if p.remote_branch_name is None:
+                raise Error.new('No debug branch configured for %r', p.current_branch)
         else:
-            p.remote_branch_name = self.git_config_get_default(config.branch_key_remote(p.current_branch), p.current_branch)
+            p.remote_branch_name = cfg.get(config.branch_key_remote(p.current_branch), p.current_branch)
 
         if (not pr or p.debug) and not need_url:
             return p
 
-        p.upstream_branch_name = self.git_config_get(config.branch_key_upstream(p.current_branch))
-        p.remote_url = self.git_config_get(config.remote_key_url(p.remote_name))
+        p.upstream_branch_name = cfg.get(config.branch_key_upstream(p.current_branch))
+        if p.upstream_branch_name is None:
+            raise Error.new('No upstream branch configured for %r', p.current_branch)
+        p.remote_url = cfg.get(config.remote_key_url(p.remote_name))
         if not p.remote_url:
             raise Error.new('No URL found for %r', p.remote_name)
         url_m = self.REMOTE_RE.match(p.remote_url)
@@ -8,14 +8,25 @@ import logging
 import shlex
 import subprocess
 
-from dsapy import app
-
 import jflow
 
 _logger = logging.getLogger(__name__)
 _encoding = locale.getpreferredencoding()
 
 
+# Same as jf.command._Cmdline; jflow does not depend on jf.
+class _Cmdline(object):
+    '''Shell-quoted command line, built only if the log record is emitted.'''
+
+    __slots__ = ('cmds',)
+
+    def __init__(self, *cmds):
+        self.cmds = cmds
+
+    def __str__(self):
+        return ' | '.join(' '.join(shlex.quote(s) for s in args) for args in self.cmds)
+
+
 class Cmd(object):
     '''Command runner.'''
 
@@ -46,67 +57,55 @@ class Cmd(object):
 
     @classmethod
     def cmd_output_ret(cls, args, check=True):
-        _logger.info('Run[yes]: %s', ' '.join(shlex.quote(s) for s in args))
-        p = subprocess.run(args, encoding=_encoding, stdout=subprocess.PIPE, check=check, universal_newlines=True)
+        _logger.info('Run[yes]: %s', _Cmdline(args))
+        p = subprocess.run(args, encoding=_encoding, stdout=subprocess.PIPE, check=check)
         return jflow.output_lines(p.stdout), p.returncode
 
-    def cmd_action(self, args, check=True):
+    @classmethod
+    def cmd_output_iter(cls, args, check=True):
+        '''Yields output lines as the command produces them.'''
+        _logger.info('Run[yes]: %s', _Cmdline(args))
+        with subprocess.Popen(args, encoding=_encoding, stdout=subprocess.PIPE) as p:
+            for line in p.stdout:
+                yield jflow.strip_suffix('\n', line)
+        if check and p.returncode:
+            raise subprocess.CalledProcessError(p.returncode, args)
+
+    @classmethod
+    def cmd_output_z(cls, args, check=True):
+        '''Runs a command with NUL-terminated output (`-z`) and returns its records.'''
+        _logger.info('Run[yes]: %s', _Cmdline(args))
+        p = subprocess.run(args, encoding=_encoding, stdout=subprocess.PIPE, check=check)
+        records = p.stdout.split('\0') if p.stdout else []
+        if records and not records[-1]:
+            records.pop()
+        return records
+
+    def cmd_action(self, args, check=True, input=None):
         run_str = 'dry' if self.flags.dry_run else 'yes'
-        _logger.info('Run[%s]: %s', run_str, ' '.join(shlex.quote(s) for s in args))
+        _logger.info('Run[%s]: %s', run_str, _Cmdline(args))
         if self.flags.dry_run:
             return 0
-        p = subprocess.run(args, encoding=_encoding, check=check, universal_newlines=True)
+        p = subprocess.run(args, encoding=_encoding, input=input, check=check)
         return p.returncode
 
     def cmd_action_pipe(self, cmds):
+        cmds = list(cmds)
         run_str = 'dry' if self.flags.dry_run else 'yes'
-        cmdq = ' | '.join(
-            ' '.join(shlex.quote(s) for s in args)
-            for args in cmds
-        )
-        _logger.info('Run[%s]: %s', run_str, cmdq)
+        _logger.info('Run[%s]: %s', run_str, _Cmdline(*cmds))
         if self.flags.dry_run:
             return 0
-        proc = None
-        pipe_out = None
-        for args, m in IterWithMarks(cmds):
-            stdout = None if m.last else subprocess.PIPE
-            last_args = args
-            proc = subprocess.Popen(args, encoding=_encoding, stdin=pipe_out, stdout=stdout, universal_newlines=True)
-            pipe_out = None if m.last else proc.stdout
-        if proc is None:
+        if not cmds:
             return 0
+        if len(cmds) == 1:
+            subprocess.run(cmds[0], encoding=_encoding, check=True)
+            return
+        last = len(cmds) - 1
+        pipe_out = None
+        for i, args in enumerate(cmds):
+            stdout = None if i == last else subprocess.PIPE
+            proc = subprocess.Popen(args, encoding=_encoding, stdin=pipe_out, stdout=stdout)
+            pipe_out = proc.stdout
         retcode = proc.wait()
         if retcode:
             raise subprocess.CalledProcessError(retcode, args)
-
-
-class IterMarks(object):
-    def __init__(self, index=0, last=False):
-        self.index = index
-        self.last = last
-
-
-class IterWithMarks(object):
-    def __init__(self, it):
-        self._it = iter(it)
-        self._next, self._eoi = self._get_next()
-        self._i = 0
-
-    def _get_next(self):
-        n, e = None, True
-        for v in self._it:
-            n, e = v, False
-            break
-        return n, e
-
-    def __iter__(self):
-        return self
-
-    def __next__(self):
-        if self._eoi:
-            raise StopIteration
-        v, i = self._next, self._i
-        self._i += 1
-        self._next, self._eoi = self._get_next()
-        return v, IterMarks(index=i, last=self._eoi)
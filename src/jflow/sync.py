@@ -33,17 +33,48 @@ class SyncMixin(green.Mixin, branch.TreeBuilder, git.Git, run.Cmd):
             help='Update tested/develop locally',
         )
 
-    def sync(self):
-        refs = {r.ref:r for r in self.for_each_ref()}
-        remotes = {r.remote + '/' + r.name:r for r in refs.values() if r.fmt == 'remote'}
+    def ref_info(self, refs):
+        '''Maps existing refs among full ref names `refs` to (sha, upstream ref).'''
+        refs = set(refs)
+        cmd = ['git', 'for-each-ref', '--format=%(refname) %(objectname) %(upstream)'] + sorted(refs)
+        info = {}
+        for line in self.cmd_output_iter(cmd):
+            ref, _, rest = line.partition(' ')
+            sha, _, upstream = rest.partition(' ')
+            # Patterns also match refs below them, e.g. refs/heads/develop/x.
+            if ref in refs:
+                info[ref] = (sha, upstream)
+        return info
+
+    def sync_mirrors(self, mirrors):
+        '''Resets local branches to remote ones, `mirrors` is {local: remote}.'''
+        heads = {b: self.HEAD_PREFIX + b for b in mirrors}
+        remotes = {b: self.REMOTE_PREFIX + r for b, r in mirrors.items()}
+        info = self.ref_info(list(heads.values()) + list(remotes.values()))
+        checked_out = self.git_worktree_branches()
+        updates = []
+        for b, remote in mirrors.items():
+            if remotes[b] not in info:
+                continue
+            new, _ = info[remotes[b]]
+            old, upstream = info.get(heads[b], (None, None))
+            if old is None or upstream != remotes[b] or heads[b] in checked_out:
+                # `git branch` sets up tracking and refuses to move a branch
+                # checked out in a worktree.
+                self.cmd_action(['git', 'branch', '--force', b, remote])
+            elif old != new:
+                _logger.info('Reset %s to %s', b, remote)
+                updates.append(f'update {heads[b]}\0{new}\0{old}\0')
+        if updates:
+            # The remaining branches move in one atomic update-ref transaction.
+            self.cmd_action(['git', 'update-ref', '-m', 'sync', '--stdin', '-z'], input=''.join(updates))
 
+    def sync(self):
         with self.git_detach_head():
             self.cmd_action(['git', 'fetch', '--all', '--prune'])
-            if 'origin/develop' in remotes:
-                self.cmd_action(['git', 'branch', '--force', 'develop', 'origin/develop'])
-            if 'origin/master' in remotes:
-                self.cmd_action(['git', 'branch', '--force', 'master', 'origin/master'])
-            if not self.flags.with_green and green.GREEN_DEVELOP_UPSTREAM in remotes:
-                self.cmd_action(['git', 'branch', '--force', green.GREEN_DEVELOP, green.GREEN_DEVELOP_UPSTREAM])
+            mirrors = {'develop': 'origin/develop', 'master': 'origin/master'}
+            if not self.flags.with_green:
+                mirrors[green.GREEN_DEVELOP] = green.GREEN_DEVELOP_UPSTREAM
+            self.sync_mirrors(mirrors)
             if self.flags.with_green:
                 self.green()
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+# -*- mode: python; coding: utf-8 -*-
+
+import logging
+import os
+import subprocess
+import tempfile
+import unittest
+
+from jf import git
+
+
+_logger = logging.getLogger(__name__)
+
+
+class TestKind(unittest.TestCase):
+    def test_kind(self):
+        cases = [
+            ('refs/heads/master', git.Kind.head),
+            ('refs/heads/feature/x', git.Kind.head),
+            ('refs/heads/master.stgit', git.Kind.stgit),
+            ('refs/tags/v1.0', git.Kind.tag),
+            ('refs/remotes/origin/master', git.Kind.remote),
+            ('refs/patches/master/fix', git.Kind.patch),
+            ('refs/patches/master/fix.log', git.Kind.patch_log),
+            ('refs/stash', git.Kind.unknown),
+            ('refs/heads', git.Kind.unknown),
+            ('HEAD', git.Kind.unknown),
+            ('', git.Kind.unknown),
+        ]
+        for ref_name, kind in cases:
+            with self.subTest(ref_name=ref_name):
+                self.assertEqual(kind, git.parse_refname(ref_name)[0])
+                self.assertEqual(kind, git.RefName(ref_name).kind)
+
+
+class TestParseRefname(unittest.TestCase):
+    def test_parse(self):
+        cases = [
+            ('refs/heads/a/b', (git.Kind.head, git.HEAD_PREFIX, 'a/b')),
+            ('refs/remotes/origin/a', (git.Kind.remote, git.REMOTE_PREFIX, 'origin/a')),
+            ('refs/tags/v1', (git.Kind.tag, git.TAG_PREFIX, 'v1')),
+            ('refs/patches/a/p.log', (git.Kind.patch_log, git.GENERIC_PREFIX, 'patches/a/p.log')),
+            ('refs/stash', (git.Kind.unknown, git.GENERIC_PREFIX, 'stash')),
+            ('refs/heads', (git.Kind.unknown, git.GENERIC_PREFIX, 'heads')),
+            ('HEAD', (git.Kind.unknown, '', 'HEAD')),
+        ]
+        for ref_name, parsed in cases:
+            with self.subTest(ref_name=ref_name):
+                self.assertEqual(parsed, git.parse_refname(ref_name))
+
+
+class TestRefName(unittest.TestCase):
+    def test_parts(self):
+        cases = [
+            ('refs/heads/feature/x', 'feature/x', git.REMOTE_LOCAL, 'feature/x'),
+            ('refs/heads/master.stgit', 'master.stgit', git.REMOTE_LOCAL, 'master.stgit'),
+            ('refs/remotes/origin/feature/x', 'origin/feature/x', 'origin', 'feature/x'),
+            ('refs/tags/v1.0', 'v1.0', git.REMOTE_LOCAL, None),
+            ('refs/patches/master/fix', 'patches/master/fix', git.REMOTE_LOCAL, None),
+            ('HEAD', 'HEAD', git.REMOTE_LOCAL, None),
+        ]
+        for ref_name, short, remote, branch in cases:
+            with self.subTest(ref_name=ref_name):
+                r = git.RefName(ref_name)
+                self.assertEqual(short, r.short)
+                self.assertEqual(remote, r.remote)
+                self.assertEqual(branch, r.branch)
+                self.assertEqual(branch is not None, r.is_branch)
+                self.assertEqual(remote != git.REMOTE_LOCAL, r.is_remote)
+
+
+class TestPeel(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        self._git('init', '-q')
+        self._git('commit', '-q', '--allow-empty', '-m', 'init')
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _git(self, *args):
+        env = dict(
+            os.environ,
+            GIT_AUTHOR_NAME='test', GIT_AUTHOR_EMAIL='test@example.com',
+            GIT_COMMITTER_NAME='test', GIT_COMMITTER_EMAIL='test@example.com',
+        )
+        proc = subprocess.run(['git'] + list(args), check=True, stdout=subprocess.PIPE, text=True, env=env)
+        return proc.stdout.strip()
+
+    def test_nested_tag_of_commit(self):
+        self._git('tag', '-a', '-m', 'inner', 'inner')
+        self._git('tag', '-a', '-m', 'outer', 'outer', 'inner')
+        self.assertEqual(self._git('rev-parse', 'HEAD'), git.peel('refs/tags/outer'))
+
+    def test_nested_tag_of_tree(self):
+        tree = self._git('rev-parse', 'HEAD^{tree}')
+        self._git('tag', '-a', '-m', 'inner', 'inner', tree)
+        self._git('tag', '-a', '-m', 'outer', 'outer', 'inner')
+        self.assertEqual(tree, git.peel('refs/tags/outer'))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
+    unittest.main()